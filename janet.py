@@ -4,15 +4,31 @@ Janet — a simple CLI assistant for Gmail MCP.
 
 from __future__ import annotations
 
-from datetime import datetime
-import os
-import json
 import asyncio
-from typing import Any, Dict, List, Optional, TypedDict
+import functools
+import importlib.util
+import json
+import os
+import re
+import signal
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
+
+import anyio
+import httpx
+from mcp import ClientSession
+
+# openai is only needed for the OpenAI paths; Ollama-only setups can run without it
+try:
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+except ImportError:
+    AsyncOpenAI = DefaultAsyncHttpxClient = None
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from janet_email import (
+    connect_gmail_server,
     handle_send_email,
     handle_search_and_read,
     handle_read_email,
@@ -23,17 +39,28 @@ from janet_calendar import (
     connect_calendar_server,
     handle_create_event,
     handle_list_events,
-    handle_delete_event,
 )
 from janet_pdf import pdf_session, handle_read_pdfs, handle_query_pdfs
-from openai import AsyncOpenAI
-import re
-
 from janet_search import perform_web_search, search_session
 from janet_papa_johns_pizza import handle_order_pizza as handle_order_papa
 from janet_pizza import handle_order_pizza as handle_order_dominos
+import janet_plan_cache as plan_cache
+
+# Optional fast JSON (C extension); stdlib json otherwise
+try:
+    import orjson
 
+    def _loads(data: str) -> Any:
+        return orjson.loads(data)
 
+    def _dumps_pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _loads(data: str) -> Any:
+        return json.loads(data)
+
+    def _dumps_pretty(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
 
 
 # -------------------------
@@ -41,15 +68,74 @@ from janet_pizza import handle_order_pizza as handle_order_dominos
 # -------------------------
 
 SENDER_NAME: str = os.getenv("JANET_SENDER_NAME", "Navya")
+# JANET_DEBUG=1 prints each plan; off by default so plans are never serialized for nothing
+DEBUG: bool = os.getenv("JANET_DEBUG", "0") == "1"
 # ----------------- MODEL CONFIGURATION -----------------
-# Separate toggles for core (intent, ask_user) vs tools (PDF, web)
-# Defaults: core uses GPT, tools use Ollama
-USE_OLLAMA_CORE = False
-USE_OLLAMA_TOOLS = True
 OLLAMA_MODEL = os.getenv("JANET_OLLAMA_MODEL", "llama3")  # e.g., "mistral", "phi3"
 OPENAI_MODEL = os.getenv("JANET_MODEL", "gpt-4o")  # or "gpt-4o-mini" for speed
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """
+    Separate toggles for core (intent, ask_user) vs tools (PDF, web).
+    Defaults: core uses GPT, tools use Ollama.
+    """
+    use_ollama_core: bool = False
+    use_ollama_tools: bool = True
+    ollama_model: str = OLLAMA_MODEL
+    openai_model: str = OPENAI_MODEL
+
+
+# Per-context so each conversation can switch models independently;
+# "switch model" sets a new (immutable) config rather than mutating globals.
+MODEL_CONFIG: ContextVar[ModelConfig] = ContextVar("model_config", default=ModelConfig())
 # -------------------------------------------------------
 
+# Shared OpenAI client so every turn reuses the same connection pool
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def _get_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        if AsyncOpenAI is None:
+            raise RuntimeError("openai is not installed (pip install openai)")
+        _openai_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(
+                # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60.0),
+            ),
+        )
+    return _openai_client
+
+
+# Shared Ollama client (ollama is optional, so it's imported on first use)
+_ollama_client: Optional[Any] = None
+
+
+def _get_ollama() -> Optional[Any]:
+    """Return the shared ollama.AsyncClient, or None if ollama isn't installed."""
+    global _ollama_client
+    if _ollama_client is None:
+        try:
+            import ollama
+        except ImportError:
+            return None
+        _ollama_client = ollama.AsyncClient()
+    return _ollama_client
+
+
+async def _close_client() -> None:
+    """Close the shared OpenAI client (and its connection pool) if it was created."""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
 
 
 # -------------------------
@@ -62,151 +148,351 @@ class Plan(TypedDict, total=False):
 
 
 #Helper
+async def _aread(prompt: str) -> str:
+    """input() on a worker thread so the event loop keeps running while we wait."""
+    return await asyncio.to_thread(input, prompt)
+
+
 async def handle_ask_user(action_json, llm_client, context):
     """
     Handles ask_user: asks a clarification question and re-runs the LLM with context.
     """
     question = action_json["params"].get("question", "Could you clarify?")
     print(f"❓ {question}")
-    user_reply = input("You: ").strip()
+    user_reply = (await _aread("You: ")).strip()
 
     # Append user clarification to conversation context
     context.append({"role": "assistant", "content": question})
     context.append({"role": "user", "content": user_reply})
 
     # Ask LLM again with updated context, honoring model switch
-    if USE_OLLAMA_CORE:
-        try:
-            import ollama
-            print(f"🧠 Using local Ollama model: {OLLAMA_MODEL}")
-            response = ollama.chat(
-                model=OLLAMA_MODEL,
-                messages=context,
-            )
-            raw_output = response["message"]["content"].strip()
-        except Exception as e:
-            print("⚠️ Ollama error during clarification:", e)
-            return None
-    else:
-        completion = await llm_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=context,
-            temperature=0.1,
-        )
-        raw_output = completion.choices[0].message.content.strip()
+    new_json = await _complete_json(context, MODEL_CONFIG.get(), temperature=0.1, llm_client=llm_client)
+    if new_json is not None and DEBUG:
+        print(f"🧩 Updated plan: {_dumps_pretty(new_json)}")
+    return new_json
+
+
+
+# -------------------------
+# LLM Intent Interpretation
+# -------------------------
+
+_STATIC_PROMPT_HEAD: str = "".join([
+    "You are Janet, a personal assistant for Navya that converts user requests into JSON tool calls "
+    "for Gmail, Google Calendar, PDF Reader MCP, web search and pizza ordering.\n\n",
+
+    # NEW: Include 'answer' and 'ask_user'
+    "Supported actions: send_email, draft_email, read_email, search_emails, create_event, "
+    "list_events, read_pdf, query_pdf, search_web, ask_user, order_pizza, parallel.\n\n",
+
+    f"Respond ONLY in valid JSON with no explanations. When drafting or sending emails, you may sign them as:\n\nBest,\n{SENDER_NAME}\n\n",
+])
 
-    # ✅ --- Strip markdown fences like ```json ... ```
-    cleaned_output = re.sub(r"^```(?:json)?|```$", "", raw_output, flags=re.MULTILINE).strip()
+# Ordered (text, is_example) pieces of the prompt body. Examples help the model
+# early on but cost input tokens on every turn, so the lean prompt drops them.
+_PROMPT_SEGMENTS: List[Tuple[str, bool]] = [
+    # ---------------- DECISION RULES (IMPORTANT) ----------------
+    # These prevent misrouting like your example.
+    ("Decision rules:\n"
+     " - Use search_emails ONLY for questions that explicitly relate to the inbox/mail (e.g., 'did I get a reply', 'find email from...').\n"
+     " - If the question is about PDFs you've already read, use query_pdf.\n", False),
 
+    # ---------------- EMAIL RULES ----------------
+    ("For emails, DO NOT GUESS recipients. Ask clarifying question through ask_user if needed."
+     "For send_email: include {\"to\": [emails], \"subject\": string, \"body\": string}\n"
+     "For draft_email: same fields as send_email, but action is 'draft_email'\n"
+     "For read_email: include optional filters like {\"from\": string, \"subject\": string}.\n"
+     "For search_emails: always include a Gmail-style query string (from:, to:, subject:, keywords), "
+     "plus an optional preview_count (integer) when the user wants to see several matching emails.\n"
+     "If send_email or draft_email would be missing to, subject or body, return ask_user with one question "
+     "that names exactly the missing fields instead of a partial email.\n", False),
+    ("Example:\n"
+     "  User: check if I got a reply from alice@example.com about the meeting\n"
+     "  → {\"action\": \"search_emails\", \"params\": {\"query\": \"from:alice@example.com subject:meeting\"}}\n", True),
+    ("\n", False),
+
+    # ---------------- CALENDAR RULES ----------------
+    ("For create_event: include summary (string), start (ISO datetime), end (ISO datetime), attendees (array), and optional location.\n"
+     "For list_events:\n"
+     " - Always infer the correct date range from the query.\n"
+     " - Output 'start_date' and 'end_date' in ISO 8601 format (e.g., '2025-10-23T00:00:00').\n"
+     " - If the user says 'today', 'tomorrow', 'this week', 'next week', or gives dates, infer both.\n"
+     " - If no date is given, use the next 7 days.\n"
+     " - DO NOT GUESS any attendees. Ask clarifying question through ask_user if needed.\n", False),
+    ("Example:\n"
+     "User: 'What events do I have for tomorrow?'\n"
+     "→ {\"action\": \"list_events\", \"params\": {\"start_date\": \"2025-10-24T00:00:00\", \"end_date\": \"2025-10-24T23:59:59\"}}\n"
+     "User: 'Show me events between Oct 25 and Oct 28'\n"
+     "→ {\"action\": \"list_events\", \"params\": {\"start_date\": \"2025-10-25T00:00:00\", \"end_date\": \"2025-10-28T23:59:59\"}}\n", True),
+
+    # ---------------- PDF READER RULES ----------------
+    ("For read_pdf:\n"
+     " - Include {\"sources\": [{\"path\": \"<file_path>\"}]}.\n", False),
+    (" - Example: 'Read the pdf shortStory1.pdf' → "
+     "{\"action\": \"read_pdf\", \"params\": {\"sources\": [{\"path\": \"shortStory1.pdf\"}]}}\n", True),
+    (" - If the filename/path is missing, use ask_user.\n"
+     "For query_pdf:\n"
+     " - Include {\"question\": string}.\n"
+     "Do not paraphrase or rename or change the user's question and preserve the user's exact wording\n", False),
+    (" - Example: 'What is the story in shortStory1.pdf about?' → "
+     "{\"action\": \"query_pdf\", \"params\": {\"question\": \"What is the story in shortStory1.pdf about?\"}}\n", True),
+    (" - Only answer based on PDFs that have already been read.\n\n", False),
+
+    #WEB SEARCH RULES
+    ("For search_web: include {\"query\": string} when the user request requires looking up information online.\n", False),
+    (" - Example: 'What is the latest SpaceX Starship status?' → "
+     "{\"action\": \"search_web\", \"params\": {\"query\": \"latest SpaceX Starship status\"}}\n", True),
+    (" - Use this action when you need real-time or external data not covered by email, calendar or PDFs.\n\n", False),
+
+    # ---------------- ASK_USER ----------------
+    # "For ask_user: include {\"question\": string} when clarification is required.\n"
+    ('''For ask_user:
+    If you are uncertain about:
+    - which tool or MCP server is most appropriate (e.g., the user might mean reading a PDF vs searching the web, or sending a meeting invite vs scheduling an event),
+    - or if essential parameters are missing (like recipient email, subject, file name, dates, time range, or search query), then you must NOT guess or act ambiguously.
+    Instead, respond with:
+    { "action": "ask_user", "params": { "question": "<a single clear question to remove the uncertainty>" } }''', False),
+
+    # ---------------- PIZZA ----------------
+    ("For order_pizza: If the user expresses interest in ordering pizza, return JSON with order_pizza.\n\n", False),
+
+    # ---------------- PARALLEL ----------------
+    ("For parallel: if the user asks for several independent things in one message, return "
+     "{\"action\": \"parallel\", \"params\": {\"steps\": [<plan>, <plan>, ...]}} where each step is a normal "
+     "{\"action\": ..., \"params\": ...} object. Never nest parallel or put ask_user inside steps.\n", False),
+    ("Example:\n"
+     "User: 'find the email from alice@example.com and show my events tomorrow'\n"
+     "→ {\"action\": \"parallel\", \"params\": {\"steps\": ["
+     "{\"action\": \"search_emails\", \"params\": {\"query\": \"from:alice@example.com\"}}, "
+     "{\"action\": \"list_events\", \"params\": {\"start_date\": \"2025-10-24T00:00:00\", \"end_date\": \"2025-10-24T23:59:59\"}}]}}\n\n", True),
+]
+
+
+# Byte-identical across turns so OpenAI's automatic prefix caching can reuse them;
+# the only dynamic piece (today's date) goes in a trailing system message.
+_FULL_SYSTEM_PROMPT: str = _STATIC_PROMPT_HEAD + "".join(text for text, _ in _PROMPT_SEGMENTS)
+_LEAN_SYSTEM_PROMPT: str = _STATIC_PROMPT_HEAD + "".join(
+    text for text, is_example in _PROMPT_SEGMENTS if not is_example
+)
+
+# After this many successfully planned turns, switch to the lean (rules-only) prompt
+_LEAN_PROMPT_AFTER = int(os.getenv("JANET_LEAN_PROMPT_AFTER", "5"))
+# Module-level, not a ContextVar: planning runs inside tasks, whose context copies
+# would swallow the increments
+_planned_turns = 0
+# Requests whose estimated prompt size exceeds this also get the lean prompt
+_PROMPT_TOKEN_LIMIT = int(os.getenv("JANET_PROMPT_TOKEN_LIMIT", "4000"))
+# Headroom for the role/format tokens the chat template wraps around each message
+_PROMPT_TOKEN_SAFETY = 32
+
+
+@functools.lru_cache(maxsize=8)
+def _encoder(model: str) -> Optional[Any]:
+    """tiktoken encoder for the model, or None when tiktoken isn't installed or can't load."""
     try:
-        new_json = json.loads(cleaned_output)
-        # print(f"🧩 Updated plan: {json.dumps(new_json, indent=2)}")
-        return new_json
-    except Exception as e:
-        print(f"⚠️ Could not parse LLM output after clarification: {e}")
-        print("LLM raw output:", completion.choices[0].message.content)
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # The BPE file is downloaded on first use; offline, stick to the estimate (cached, no retries)
         return None
 
 
+def _count_tokens(text: str, model: str) -> int:
+    enc = _encoder(model)
+    # Without tiktoken, ~4 characters per token is close enough for a budget check
+    return len(enc.encode(text)) if enc else len(text) // 4 + 1
 
-# -------------------------
-# LLM Intent Interpretation
-# -------------------------
 
-def _build_system_prompt() -> str:
-    current_date = datetime.now().strftime("%Y-%m-%d")
+@functools.lru_cache(maxsize=8)
+def _system_prompt_tokens(model: str, lean: bool = False) -> int:
+    """Token count of the static system prompt, encoded once per model."""
+    return _count_tokens(_LEAN_SYSTEM_PROMPT if lean else _FULL_SYSTEM_PROMPT, model)
+
+
+def _prompt_token_budget(user_text: str, model: str, lean: bool = False) -> int:
+    """Estimated prompt tokens for a planning call; only the user text is encoded."""
+    return _system_prompt_tokens(model, lean) + _count_tokens(user_text, model) + _PROMPT_TOKEN_SAFETY
+
 
+@functools.lru_cache(maxsize=4)
+def _cached_prompt(current_date: str, lean: bool = False) -> Tuple[Dict[str, str], ...]:
+    """Assemble the system messages once per calendar day."""
     return (
-        "You are Janet, a personal assistant for Navya that converts user requests into JSON tool calls "
-        "for Gmail, Google Calendar, PDF Reader MCP, web search and pizza ordering.\n\n"
-
-        # NEW: Include 'answer' and 'ask_user'
-        "Supported actions: send_email, draft_email, read_email, search_emails, create_event, "
-        "list_events, read_pdf, query_pdf, search_web, ask_user, order_pizza.\n\n"
-
-        f"Respond ONLY in valid JSON with no explanations. When drafting or sending emails, you may sign them as:\n\nBest,\n{SENDER_NAME}\n\n"
-        f"For context, today's date: {current_date}\n\n"
-
-        # ---------------- DECISION RULES (IMPORTANT) ----------------
-        # These prevent misrouting like your example.
-        "Decision rules:\n"
-        " - Use search_emails ONLY for questions that explicitly relate to the inbox/mail (e.g., 'did I get a reply', 'find email from...').\n"
-        " - If the question is about PDFs you've already read, use query_pdf.\n"
-
-        # ---------------- EMAIL RULES ----------------
-        "For emails, DO NOT GUESS recipients. Ask clarifying question through ask_user if needed."
-        "For send_email: include {\"to\": [emails], \"subject\": string, \"body\": string}\n"
-        "For draft_email: same fields as send_email, but action is 'draft_email'\n"
-        "For read_email: include optional filters like {\"from\": string, \"subject\": string}.\n"
-        "For search_emails: always include a Gmail-style query string (from:, to:, subject:, keywords). Example:\n"
-        "  User: check if I got a reply from alice@example.com about the meeting\n"
-        "  → {\"action\": \"search_emails\", \"params\": {\"query\": \"from:alice@example.com subject:meeting\"}}\n\n"
-
-        # ---------------- CALENDAR RULES ----------------
-        "For create_event: include summary (string), start (ISO datetime), end (ISO datetime), attendees (array), and optional location.\n"
-        "For list_events:\n"
-        " - Always infer the correct date range from the query.\n"
-        " - Output 'start_date' and 'end_date' in ISO 8601 format (e.g., '2025-10-23T00:00:00').\n"
-        " - If the user says 'today', 'tomorrow', 'this week', 'next week', or gives dates, infer both.\n"
-        " - If no date is given, use the next 7 days.\n"
-        " - DO NOT GUESS any attendees. Ask clarifying question through ask_user if needed.\n"
-        "Example:\n"
-        "User: 'What events do I have for tomorrow?'\n"
-        "→ {\"action\": \"list_events\", \"params\": {\"start_date\": \"2025-10-24T00:00:00\", \"end_date\": \"2025-10-24T23:59:59\"}}\n"
-        "User: 'Show me events between Oct 25 and Oct 28'\n"
-        "→ {\"action\": \"list_events\", \"params\": {\"start_date\": \"2025-10-25T00:00:00\", \"end_date\": \"2025-10-28T23:59:59\"}}\n"
-
-        # ---------------- PDF READER RULES ----------------
-        "For read_pdf:\n"
-        " - Include {\"sources\": [{\"path\": \"<file_path>\"}]}.\n"
-        " - Example: 'Read the pdf shortStory1.pdf' → "
-        "{\"action\": \"read_pdf\", \"params\": {\"sources\": [{\"path\": \"shortStory1.pdf\"}]}}\n"
-        " - If the filename/path is missing, use ask_user.\n"
-        "For query_pdf:\n"
-        " - Include {\"question\": string}.\n"
-        "Do not paraphrase or rename or change the user's question and preserve the user's exact wording\n"
-        " - Example: 'What is the story in shortStory1.pdf about?' → "
-        "{\"action\": \"query_pdf\", \"params\": {\"question\": \"What is the story in shortStory1.pdf about?\"}}\n"
-        " - Only answer based on PDFs that have already been read.\n\n"
-
-        #WEB SEARCH RULES
-        "For search_web: include {\"query\": string} when the user request requires looking up information online.\n"
-        '''- Example: 'What is the latest SpaceX Starship status?'
-           -{"action": "search_web", "params": {"query": "latest SpaceX Starship status"}}
-           - Use this action when you need real-time or external data not covered by email, calendar or PDFs.\n\n'''
-
-        # ---------------- ASK_USER ----------------
-        # "For ask_user: include {\"question\": string} when clarification is required.\n"
-        '''For ask_user:
-        If you are uncertain about:
-        - which tool or MCP server is most appropriate (e.g., the user might mean reading a PDF vs searching the web, or sending a meeting invite vs scheduling an event),
-        - or if essential parameters are missing (like recipient email, subject, file name, dates, time range, or search query), then you must NOT guess or act ambiguously.
-        Instead, respond with:
-        { "action": "ask_user", "params": { "question": "<a single clear question to remove the uncertainty>" } }'''
-
-        # ---------------- PIZZA ----------------
-        "For order_pizza: If the user expresses interest in ordering pizza, return JSON with order_pizza.\n\n"
+        {"role": "system", "content": _LEAN_SYSTEM_PROMPT if lean else _FULL_SYSTEM_PROMPT},
+        {"role": "system", "content": f"For context, today's date: {current_date}"},
     )
 
 
+def _system_cache_block(lean: bool = False) -> List[Dict[str, str]]:
+    """System messages with the cacheable static prefix first and the date last."""
+    return list(_cached_prompt(datetime.now().strftime("%Y-%m-%d"), lean))
+
+
+def _report_cache_usage(completion: Any) -> None:
+    """Print how many prompt tokens OpenAI served from its prefix cache (debug only)."""
+    if not DEBUG:
+        return
+    details = getattr(getattr(completion, "usage", None), "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    if cached:
+        print(f"⚡ Prompt cache hit: {cached} tokens")
+
+
+
+_DECODER = json.JSONDecoder()
+
+
+def _decode_json_obj(text: str) -> Any:
+    """
+    Decode the first JSON object in text, ignoring any prose before or after it.
+
+    raw_decode stops at the end of that object, so there is no rfind("}") guess
+    and a second object or trailing explanation doesn't break parsing.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    obj, _ = _DECODER.raw_decode(text, start)
+    return obj
+
+
+# Keeps background stream drains referenced until they finish
+_background_tasks: "set[asyncio.Task]" = set()
+
+
+async def _drain_usage(stream: Any) -> None:
+    """Read the rest of a completion stream just to report prompt-cache usage."""
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                _report_cache_usage(chunk)
+    except Exception:
+        # Only stats are lost; the plan was already returned
+        pass
+
+
+def _run_in_background(coro: Awaitable[Any]) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _drain_in_background(stream: Any) -> None:
+    _run_in_background(_drain_usage(stream))
+
+
+def _store_plan(user_text: str, plan: Plan, embedding: Optional[List[float]] = None) -> None:
+    """Cache the plan, writing the cache out in the background every few new plans."""
+    plan_cache.store(user_text, plan, embedding)
+    if plan_cache.save_due():
+        _run_in_background(plan_cache.save_in_background())
+
 
-async def interpret_intent(user_text: str) -> Optional[Plan]:
-    """Use the OpenAI model — return None if invalid."""
-    from openai import AsyncOpenAI  # lazy import to avoid hard dependency at import time
+# Finds the action name in a partially streamed plan
+_ACTION_RE = re.compile(r'"action"\s*:\s*"([^"]+)"')
 
-    system_prompt = _build_system_prompt()
-    user_input = user_text
-    if USE_OLLAMA_CORE:
+
+# -------------------------
+# Fast paths (no LLM)
+# -------------------------
+
+def _day_range(offset_days: int) -> Dict[str, str]:
+    day = (datetime.now() + timedelta(days=offset_days)).strftime("%Y-%m-%d")
+    return {"start_date": f"{day}T00:00:00", "end_date": f"{day}T23:59:59"}
+
+
+# Unambiguous commands mapped straight to a plan; anything else goes to the LLM.
+_FAST_PATHS: List[Tuple[re.Pattern, Callable[[re.Match], Plan]]] = [
+    (
+        re.compile(r"^(?:list|show)(?: my)? (?:events|calendar|meetings) (today|tomorrow)[.!]?$", re.I),
+        lambda m: {"action": "list_events", "params": _day_range(0 if m[1].lower() == "today" else 1)},
+    ),
+    (
+        re.compile(r"^read(?: the)? pdf (\S+\.pdf)$", re.I),
+        lambda m: {"action": "read_pdf", "params": {"sources": [{"path": m[1]}]}},
+    ),
+    (
+        # Not a bare "search for ...": that could just as well mean the inbox. Likewise
+        # "google calendar ..." / "google my events" are about Janet's own tools, not the web.
+        re.compile(
+            r"^(?:search the web for|google(?!.*\b(?:calendar|events?|meetings?|e?-?mails?|inbox|gmail)\b)) (.+?)[.?!]?$",
+            re.I,
+        ),
+        lambda m: {"action": "search_web", "params": {"query": m[1]}},
+    ),
+    (
+        # Gmail message IDs are long hex strings, so this can't swallow "read emails" etc.
+        re.compile(r"^read(?: (?:email|message))? ([0-9a-f]{12,})$", re.I),
+        lambda m: {"action": "read_email", "params": {"messageId": m[1]}},
+    ),
+    (
+        # "check for a reply from bob@example.com about the budget"
+        re.compile(
+            r"^check (?:for |if i got )?(?:a |any )?(?:response|reply|replies) from "
+            r"([\w.+-]+@[\w-]+(?:\.[\w-]+)+)(?: about (.+?))?[.?!]?$",
+            re.I,
+        ),
+        lambda m: {"action": "search_emails", "params": {"query": f"from:{m[1]} {m[2]}" if m[2] else f"from:{m[1]}"}},
+    ),
+    (
+        re.compile(r"^order (?:a |some )?pizza[.!]?$", re.I),
+        lambda m: {"action": "order_pizza", "params": {}},
+    ),
+]
+
+
+def _fast_path(user_text: str) -> Optional[Plan]:
+    """Return a plan for trivially structured commands, or None to ask the LLM."""
+    text = user_text.strip()
+    for pattern, build in _FAST_PATHS:
+        m = pattern.match(text)
+        if m:
+            return build(m)
+    return None
+
+
+# Planner replies stream, so a 30s gap between chunks means a stalled request. Only the
+# planner gets this: PDF Q&A and web summaries send nothing until the answer is complete.
+_PLANNER_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Output cap for one plan. Plans are usually <150 tokens; the headroom is for email bodies.
+_PLAN_MAX_TOKENS = int(os.getenv("JANET_PLAN_MAX_TOKENS", "800"))
+
+
+async def _complete_json(
+    messages: List[Dict[str, str]],
+    cfg: ModelConfig,
+    *,
+    on_action: Optional[Callable[[str], None]] = None,
+    max_tokens: int = _PLAN_MAX_TOKENS,
+    temperature: float = 0,
+    llm_client: Optional[AsyncOpenAI] = None,
+) -> Optional[Any]:
+    """
+    Run a JSON-mode chat completion on the configured core model and return the parsed object.
+
+    OpenAI replies are streamed and returned as soon as the JSON object closes.
+    Returns None (after printing why) on model or parse errors.
+    """
+    obj = None
+    if cfg.use_ollama_core:
         # --- Local LLM path (Ollama) ---
         try:
-            import ollama
-            print(f"🧠 Using local Ollama model: {OLLAMA_MODEL}")
-            response = ollama.chat(
-                model=OLLAMA_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input},
-                ],
+            ollama_client = _get_ollama()
+            if ollama_client is None:
+                raise ImportError("ollama is not installed (pip install ollama)")
+            print(f"🧠 Using local Ollama model: {cfg.ollama_model}")
+            response = await ollama_client.chat(
+                model=cfg.ollama_model,
+                messages=messages,
+                format="json",
+                options={"num_predict": max_tokens},
             )
             content = response["message"]["content"].strip()
         except Exception as e:
@@ -214,228 +500,663 @@ async def interpret_intent(user_text: str) -> Optional[Plan]:
             return None
     else:
         # --- OpenAI GPT path ---
-        print(f"🧠 Using OPENAI model: {OPENAI_MODEL}")
-        client = AsyncOpenAI()
+        print(f"🧠 Using OPENAI model: {cfg.openai_model}")
         try:
-            completion = await client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input},
-                ],
-                temperature=0,
+            client = (llm_client or _get_client()).with_options(timeout=_PLANNER_TIMEOUT)
+            stream = await client.chat.completions.create(
+                model=cfg.openai_model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
             )
-            content = completion.choices[0].message.content.strip()
+            parts: List[str] = []
+            action_seen = False
+            try:
+                async for chunk in stream:
+                    if chunk.usage:
+                        _report_cache_usage(chunk)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    if not action_seen and on_action:
+                        m = _ACTION_RE.search("".join(parts))
+                        if m:
+                            action_seen = True
+                            on_action(m.group(1))
+                    if "}" in delta:
+                        try:
+                            obj = _decode_json_obj("".join(parts))
+                        except json.JSONDecodeError:
+                            continue
+                        # Object is complete: don't wait for the finish/usage chunks
+                        _drain_in_background(stream)
+                        break
+            except asyncio.CancelledError:
+                # Speculative call lost to a cache hit: release the connection
+                await stream.close()
+                raise
+            content = "".join(parts).strip()
         except Exception as e:
             print("⚠️ OpenAI error:", e)
             return None
 
     # --- Try to extract valid JSON ---
     try:
-        # handle extra text around JSON
-        start = content.find("{")
-        end = content.rfind("}")
-        if start != -1 and end != -1:
-            content = content[start:end+1]
-        plan = json.loads(content)
-        return plan
-    except Exception:
+        # Ollama may add text or code fences around the JSON; OpenAI's JSON mode never does
+        if obj is None:
+            obj = _decode_json_obj(content) if cfg.use_ollama_core else _loads(content)
+        return obj
+    except json.JSONDecodeError:
         print("Couldn't parse model output as JSON:")
         print(content)
         return None
 
+
+def _count_planned_turn() -> None:
+    global _planned_turns
+    _planned_turns += 1
+
+
+async def _call_planner(
+    user_text: str,
+    cfg: ModelConfig,
+    on_action: Optional[Callable[[str], None]] = None,
+    max_tokens: int = _PLAN_MAX_TOKENS,
+) -> Optional[Plan]:
+    """Ask the configured model for a plan; None on model or parse errors."""
+    lean = _planned_turns >= _LEAN_PROMPT_AFTER
+    if not lean and not cfg.use_ollama_core:
+        # Off the event loop: the first count may download the tokenizer
+        budget = await asyncio.to_thread(_prompt_token_budget, user_text, cfg.openai_model)
+        lean = budget > _PROMPT_TOKEN_LIMIT
+    messages = [*_system_cache_block(lean), {"role": "user", "content": user_text}]
+    return await _complete_json(messages, cfg, on_action=on_action, max_tokens=max_tokens)
+
+
+def _local_plan(user_text: str) -> Optional[Plan]:
+    """A plan from the fast paths or the exact-match cache, or None if the model is needed."""
+    plan = _fast_path(user_text)
+    if plan:
+        return plan
+    cached = plan_cache.lookup(user_text)
+    if cached:
+        print("⚡ Using cached plan")
+    return cached
+
+
+async def interpret_intent(
+    user_text: str,
+    on_action: Optional[Callable[[str], None]] = None,
+) -> Optional[Plan]:
+    """
+    Use the OpenAI model — return None if invalid.
+
+    When streaming from OpenAI, on_action(action) is called as soon as the action
+    name appears, so the caller can warm up the tool while params are generated.
+    """
+    cfg = MODEL_CONFIG.get()
+    plan: Optional[Plan] = _local_plan(user_text)
+    if plan:
+        return plan
+    embedding = None
+    semantic = plan_cache.SEMANTIC_ENABLED and not cfg.use_ollama_core and AsyncOpenAI is not None
+    # Only pay for an embedding when some cached plan could actually be reused for this text
+    if semantic and plan_cache.has_semantic_candidates(user_text):
+        # Start planning speculatively while the embedding round-trip runs;
+        # it is cancelled if a similar request turns out to be cached.
+        planning = asyncio.create_task(_call_planner(user_text, cfg, on_action))
+        embedding = await plan_cache.embed(_get_client(), user_text)
+        cached = plan_cache.lookup_semantic(embedding, user_text)
+        if cached:
+            planning.cancel()
+            print("⚡ Using cached plan (similar request)")
+            return cached
+        plan = await planning
+    else:
+        plan = await _call_planner(user_text, cfg, on_action)
+
+    if plan is None:
+        return None
+    # JSON mode guarantees valid JSON, not a plan-shaped object
+    if not isinstance(plan, dict) or "action" not in plan:
+        print("⚠️ Model reply isn't a plan (no 'action'):", plan)
+        return None
+    _count_planned_turn()
+    _store_plan(user_text, plan, embedding)
+    if semantic and embedding is None and plan_cache.semantic_reusable(plan, user_text):
+        # Embed off the critical path so paraphrases of this request can hit it later
+        _run_in_background(_embed_cached(user_text))
+    return plan
+
+
+async def _embed_cached(user_text: str) -> None:
+    embedding = await plan_cache.embed(_get_client(), user_text)
+    plan_cache.add_embedding(user_text, embedding)
+
+
+# Separates several commands typed on one line ("list events today ;; order a pizza").
+# A bare ";" is too common inside email bodies to split on.
+_COMMAND_SEP = ";;"
+
+
+async def interpret_many(texts: List[str]) -> List[Optional[Plan]]:
+    """
+    Plan several commands in order, sending everything the fast paths and the
+    exact cache can't answer to the model in a single call.
+
+    Falls back to planning those one by one if the reply doesn't hold one plan per command.
+    """
+    plans: List[Optional[Plan]] = [_local_plan(t) for t in texts]
+    misses = [i for i, plan in enumerate(plans) if plan is None]
+    if len(misses) == 1:
+        plans[misses[0]] = await interpret_intent(texts[misses[0]])
+    elif misses:
+        numbered = "\n".join(f"{n}. {texts[i]}" for n, i in enumerate(misses, start=1))
+        request = (
+            "Plan each of these commands separately and reply with "
+            '{"plans": [<plan for 1>, <plan for 2>, ...]} in the same order:\n' + numbered
+        )
+        combined = await _call_planner(request, MODEL_CONFIG.get(), max_tokens=_PLAN_MAX_TOKENS * len(misses))
+        batch = combined.get("plans") if isinstance(combined, dict) else None
+        if isinstance(batch, list) and len(batch) == len(misses) and all(isinstance(p, dict) for p in batch):
+            _count_planned_turn()
+            for i, plan in zip(misses, batch):
+                plans[i] = plan
+                if "action" in plan:
+                    _store_plan(texts[i], plan)
+        else:
+            print("⚠️ Combined plan didn't match the commands; planning them one by one.")
+            for i, plan in zip(misses, await interpret_intents([texts[i] for i in misses])):
+                plans[i] = plan
+    return plans
+
+
+# Max planner requests in flight for batch mode (keeps us under rate limits)
+_BATCH_CONCURRENCY = int(os.getenv("JANET_BATCH_CONCURRENCY", "10"))
+
+
+async def interpret_intents(texts: List[str]) -> List[Optional[Plan]]:
+    """Plan several requests concurrently; results are in the same order as texts."""
+    sem = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def _one(text: str) -> Optional[Plan]:
+        async with sem:
+            return await interpret_intent(text)
+
+    return list(await asyncio.gather(*(_one(t) for t in texts)))
+
 # -------------------------
 # Main loop and dispatch
 # -------------------------
 
+async def _hold_session(factory: Callable[[], Any], ready: asyncio.Future, stop: asyncio.Event) -> None:
+    """Enter factory(), publish the session on `ready`, and keep it open until `stop` is set."""
+    try:
+        async with factory() as session:
+            ready.set_result(session)
+            await stop.wait()
+    except BaseException as e:
+        if ready.done():
+            raise
+        ready.set_exception(e)
 
-async def main() -> None:
-    """Main Janet assistant loop with clarification support."""
-    server = StdioServerParameters(
-        command="npx",
-        args=["@gongrzhe/server-gmail-autoauth-mcp"],
-        env=os.environ.copy(),
+
+@asynccontextmanager
+async def open_sessions(*factories: Callable[[], Any]):
+    """
+    Enter several MCP session context managers concurrently and yield the sessions.
+
+    Each session lives in its own task: stdio_client uses anyio task groups, whose
+    cancel scopes must be entered and exited from the same task, so they cannot
+    simply be gathered into one AsyncExitStack.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    ready = [loop.create_future() for _ in factories]
+    tasks = [asyncio.create_task(_hold_session(f, fut, stop)) for f, fut in zip(factories, ready)]
+    try:
+        yield tuple(await asyncio.gather(*ready))
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class LazySession:
+    """
+    An MCP session opened on first use and kept alive until close().
+
+    If the server fails to start or exits, the next get() starts a fresh one.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    async def get(self) -> ClientSession:
+        if self._task is None or self._task.done():
+            self._report_exit()
+            self._stop = asyncio.Event()
+            self._ready = asyncio.get_running_loop().create_future()
+            self._task = asyncio.create_task(_hold_session(self._factory, self._ready, self._stop))
+        return await asyncio.shield(self._ready)
+
+    async def run(self, fn: Callable[[ClientSession], Awaitable[Any]]) -> Any:
+        """Call fn(session); if the server's pipe has gone away, restart it and retry once."""
+        try:
+            return await fn(await self.get())
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream):
+            print("🔄 Tool server connection lost — restarting it...")
+            await self.close(report=True)
+            return await fn(await self.get())
+
+    def _report_exit(self) -> None:
+        """Log why a finished session task failed; this also marks its exception as retrieved."""
+        if self._task is None or not self._task.done() or self._task.cancelled():
+            return
+        error = self._task.exception()
+        if error is not None:
+            print(f"⚠️ Tool server session ended with an error: {error!r}")
+
+    async def close(self, report: bool = False) -> None:
+        if self._task is not None:
+            self._stop.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            if report:
+                self._report_exit()
+            self._task = None
+
+
+@dataclass
+class DispatchContext:
+    """Sessions and per-turn state shared by the action handlers."""
+    gmail: ClientSession
+    calendar: ClientSession
+    llm_client: Optional[AsyncOpenAI]
+    pdf: LazySession
+    search: LazySession
+    text: str = ""
+
+
+# ---------------- EMAIL ----------------
+async def _do_send_email(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_send_email(ctx.gmail, params)
+
+
+async def _do_search_emails(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_search_and_read(ctx.gmail, params)
+
+
+async def _do_read_email(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_read_email(ctx.gmail, params)
+
+
+async def _do_draft_email(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_draft_email(ctx.gmail, params)
+
+
+# ---------------- CALENDAR ----------------
+async def _do_create_event(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_create_event(ctx.calendar, params)
+
+
+async def _do_list_events(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await handle_list_events(ctx.calendar, params)
+
+
+# ---------------- PDF ----------------
+async def _do_read_pdf(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    await ctx.pdf.run(lambda session: handle_read_pdfs(session, params))
+
+
+async def _do_query_pdf(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    cfg = MODEL_CONFIG.get()
+    question = params.get("question", ctx.text)
+    await handle_query_pdfs(
+        question,
+        ctx.llm_client,
+        use_ollama=cfg.use_ollama_tools,
+        openai_model=cfg.openai_model,
+        ollama_model=cfg.ollama_model,
+        ollama_client=_get_ollama() if cfg.use_ollama_tools else None,
+    )
+
+
+# ---------------- WEB SEARCH ----------------
+async def _do_search_web(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    cfg = MODEL_CONFIG.get()
+    query = params.get("query")
+    if not query:
+        print("❓ Missing query for web search.")
+        return
+    try:
+        await ctx.search.run(lambda session: perform_web_search(
+            session,
+            query,
+            use_ollama=cfg.use_ollama_tools,
+            openai_model=cfg.openai_model,
+            ollama_model=cfg.ollama_model,
+            ollama_client=_get_ollama() if cfg.use_ollama_tools else None,
+            llm_client=ctx.llm_client,
+        ))
+    except Exception as e:
+        print(f"❌ Web search failed: {e}")
+
+
+# ---------------- PIZZA ----------------
+async def _do_order_pizza(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    try:
+        # "domino" also covers "domino's" and "dominos"
+        if "domino" in ctx.text.lower():
+            await handle_order_dominos(params)
+        else:
+            await handle_order_papa(params)
+        #await handle_order_pizza_web(pizza_web_session, params)
+    except Exception as e:
+        print(f"❌ Pizza assistant failed: {e}")
+
+
+# ---------------- MULTI-STEP ----------------
+# Read-only actions that never prompt, so their steps can safely overlap
+_CONCURRENT_ACTIONS = frozenset({"search_emails", "read_email", "list_events", "search_web"})
+
+
+async def _do_parallel(ctx: DispatchContext, params: Dict[str, Any]) -> None:
+    steps = []
+    # Ask for any missing email fields up front, before steps start printing
+    for step in params.get("steps", []):
+        if isinstance(step, dict):
+            step = await clarify_email(step)
+            if step:
+                steps.append(step)
+    concurrent = [s for s in steps if s.get("action") in _CONCURRENT_ACTIONS]
+    # The rest may prompt or depend on an earlier step (read_pdf -> query_pdf): run in order
+    sequential = [s for s in steps if s.get("action") not in _CONCURRENT_ACTIONS]
+
+    results = await asyncio.gather(
+        *(DISPATCH[s["action"]](ctx, s.get("params", {})) for s in concurrent),
+        return_exceptions=True,
     )
+    for step, result in zip(concurrent, results):
+        if isinstance(result, Exception):
+            print(f"❌ {step['action']} failed: {result}")
+
+    for step in sequential:
+        handler = DISPATCH.get(step.get("action", ""))
+        if handler and handler is not _do_parallel:
+            await handler(ctx, step.get("params", {}))
+        else:
+            print(f"🤔 Skipping unsupported step: {step.get('action')}")
+
+
+DISPATCH: Dict[str, Callable[[DispatchContext, Dict[str, Any]], Awaitable[None]]] = {
+    "send_email": _do_send_email,
+    "search_emails": _do_search_emails,
+    "read_email": _do_read_email,
+    "draft_email": _do_draft_email,
+    "create_event": _do_create_event,
+    "list_events": _do_list_events,
+    "read_pdf": _do_read_pdf,
+    "query_pdf": _do_query_pdf,
+    "search_web": _do_search_web,
+    "order_pizza": _do_order_pizza,
+    "parallel": _do_parallel,
+}
+
+
+def _prewarm(ctx: DispatchContext, action: str) -> None:
+    """Start the MCP server an upcoming action needs while the plan is still streaming."""
+    if action == "read_pdf":
+        session = ctx.pdf
+    elif action == "search_web":
+        session = ctx.search
+    else:
+        return
+    task = asyncio.create_task(session.get())
+    # Failures resurface (and are reported) when the action itself runs
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+# Cheap keyword guesses used to start a tool server before the plan exists at all
+_PREWARM_HINTS: Tuple[Tuple[re.Pattern, str], ...] = (
+    (re.compile(r"\bpdfs?\b", re.I), "read_pdf"),
+    (re.compile(r"\b(?:web|online|internet|google)\b", re.I), "search_web"),
+)
+
+
+def _prewarm_from_text(ctx: DispatchContext, text: str) -> None:
+    for pattern, action in _PREWARM_HINTS:
+        if pattern.search(text):
+            _prewarm(ctx, action)
+
+
+async def _handle_plan(ctx: DispatchContext, plan: Plan) -> None:
+    """Clarify and run one planned action (including an ask_user follow-up)."""
+    if DEBUG:
+        print("🧩 LLM output:", _dumps_pretty(plan))
+
+    action = plan.get("action", "")
+    # --- If LLM couldn’t parse or flagged invalid ---
+    if action == "invalid":
+        print(f"❌ {plan.get('reason', 'I could not extract enough information.')}")
+        return
+
+    # --- Email clarifications (subject, recipients); fills params in place ---
+    plan = await clarify_email(plan)
+    if not plan:
+        return
+
+    # --- Dispatch action ---
+    handler = DISPATCH.get(action)
+    if handler:
+        await handler(ctx, plan.get("params", {}))
+
+    # ---------------- ASK USER ----------------
+    elif action == "ask_user":
+        # Only clarification needs the conversation so far
+        context = [*_system_cache_block(), {"role": "user", "content": ctx.text}]
+        new_plan = await handle_ask_user(plan, ctx.llm_client, context)
+        if new_plan:
+            # 🌀 recursive continuation: feed new plan back into handler
+            print("🔁 Continuing with clarified action...")
+            # Same table as the first pass, so every action works as a follow-up
+            handler = DISPATCH.get(new_plan.get("action", ""))
+            if handler:
+                await handler(ctx, new_plan.get("params", {}))
+            else:
+                print("🤔 Clarification complete, but no valid follow-up action detected.")
+        else:
+            print("⚠️ Could not resolve clarification — skipping.")
+
+    # ---------------- UNKNOWN ----------------
+    else:
+        print("I didn’t understand that command.")
+
+
+_EXIT_CMDS = frozenset({"quit", "exit", "bye", ":q"})
 
-    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-    async with stdio_client(server) as (read, write):
-        async with ClientSession(read, write) as gmail_session:
-            await gmail_session.initialize()
+@asynccontextmanager
+async def janet_session():
+    """
+    Start Janet's MCP servers and LLM client once and yield a DispatchContext.
+
+    Keep it open across many interpret_and_dispatch() calls when embedding Janet,
+    so later commands skip the server spawn and MCP handshake.
+    """
+    client = _get_client() if AsyncOpenAI is not None else None
+    # PDF and web search servers start on first use, then stay up for the session
+    pdf = LazySession(pdf_session)
+    search = LazySession(search_session)
+
+    try:
+        # Spawn and initialize the Gmail and Calendar MCP servers concurrently
+        async with open_sessions(connect_gmail_server, connect_calendar_server) as (
+            gmail_session,
+            calendar_session,
+        ):
+            yield DispatchContext(gmail_session, calendar_session, client, pdf, search)
+    finally:
+        await asyncio.gather(pdf.close(), search.close())
+        await _close_client()
+        # Don't leave the session's plans to atexit alone
+        plan_cache.flush()
+
+
+async def interpret_and_dispatch(ctx: DispatchContext, text: str) -> None:
+    """Plan one request (or several joined with ';;') and run it on an open janet_session()."""
+    if _COMMAND_SEP in text:
+        commands = [c.strip() for c in text.split(_COMMAND_SEP) if c.strip()]
+        if not commands:
+            return
+        for command, plan in zip(commands, await interpret_many(commands)):
+            print(f"\n▶️ {command}")
+            if plan:
+                ctx.text = command
+                await _handle_plan(ctx, plan)
+        return
+
+    plan = await _plan_one(ctx, text)
+    if plan:
+        await _handle_plan(ctx, plan)
 
-            async with connect_calendar_server() as calendar_session:
+
+async def _plan_one(ctx: DispatchContext, text: str) -> Optional[Plan]:
+    """Plan a single request, warming up any server it is likely to need meanwhile."""
+    ctx.text = text
+    # Overlap server startup with planning; a wrong guess just leaves it idle
+    _prewarm_from_text(ctx, text)
+    return await interpret_intent(text, on_action=functools.partial(_prewarm, ctx))
+
+
+async def _finish_pending(pending: Optional[asyncio.Task]) -> None:
+    """Wait for a background action; its failure is reported, not raised into the next command."""
+    if pending is None:
+        return
+    try:
+        await pending
+    except Exception as e:
+        print(f"❌ Previous request failed: {e}")
+
+
+async def main(batch_path: Optional[str] = None) -> None:
+    """Main Janet assistant loop with clarification support."""
+    async with janet_session() as ctx:
+        print(
+            "👋 Janet ready!\n"
+            "Capabilities: Email (send/draft/read/search), Calendar (create/list), PDF (read + Q&A), Web Search, and Pizza ordering (Papa John's by default; Domino's on request).\n"
+            "Try: 'send email', 'list meetings tomorrow', 'read pdf shortStory1.pdf', 'search the web for …', or 'order a pizza'."
+        )
+
+        if batch_path:
+            # Plan every request up front (concurrently), then run them in order
+            with open(batch_path, "r", encoding="utf-8") as f:
+                texts = [line.strip() for line in f if line.strip()]
+            plans = await interpret_intents(texts)
+            for text, plan in zip(texts, plans):
+                print(f"\n▶️ {text}")
+                if not plan:
+                    continue
+                ctx.text = text
+                await _handle_plan(ctx, plan)
+            return
+
+        # A read-only action still running in the background; the next request is
+        # read and planned meanwhile, then waits for it before dispatching
+        pending: Optional[asyncio.Task] = None
+        while True:
+            text = (await _aread("\nYou (or 'quit'): ")).strip()
+            lower = text.lower()
+            if lower in _EXIT_CMDS:
+                await _finish_pending(pending)
+                print("👋 Goodbye!")
+                break
+
+            # Toggle model on the fly
+            if lower.startswith("switch model"):
+                cfg = MODEL_CONFIG.get()
+                if lower.startswith("switch model core"):
+                    cfg = replace(cfg, use_ollama_core=not cfg.use_ollama_core)
+                    print(f"🔁 Core intent now: {'Ollama' if cfg.use_ollama_core else 'OpenAI'}")
+                elif lower.startswith("switch model tools"):
+                    cfg = replace(cfg, use_ollama_tools=not cfg.use_ollama_tools)
+                    print(f"🔁 Tools now: {'Ollama' if cfg.use_ollama_tools else 'OpenAI'}")
+                else:
+                    cfg = replace(
+                        cfg,
+                        use_ollama_core=not cfg.use_ollama_core,
+                        use_ollama_tools=not cfg.use_ollama_tools,
+                    )
                     print(
-                        "👋 Janet ready!\n"
-                        "Capabilities: Email (send/draft/read/search), Calendar (create/list), PDF (read + Q&A), Web Search, and Pizza ordering (Papa John's by default; Domino's on request).\n"
-                        "Try: 'send email', 'list meetings tomorrow', 'read pdf shortStory1.pdf', 'search the web for …', or 'order a pizza'."
+                        f"🔁 Core: {'Ollama' if cfg.use_ollama_core else 'OpenAI'}, Tools: {'Ollama' if cfg.use_ollama_tools else 'OpenAI'}"
                     )
+                MODEL_CONFIG.set(cfg)
+                continue
 
-                    while True:
-                        text = input("\nYou (or 'quit'): ").strip()
-                        if text.lower() in {"quit", "exit"}:
-                            print("👋 Goodbye!")
-                            break
-
-                        # Toggle model on the fly
-                        if text.lower().startswith("switch model"):
-                            global USE_OLLAMA_CORE, USE_OLLAMA_TOOLS
-                            lower = text.lower()
-                            if lower.startswith("switch model core"):
-                                USE_OLLAMA_CORE = not USE_OLLAMA_CORE
-                                print(f"🔁 Core intent now: {'Ollama' if USE_OLLAMA_CORE else 'OpenAI'}")
-                            elif lower.startswith("switch model tools"):
-                                USE_OLLAMA_TOOLS = not USE_OLLAMA_TOOLS
-                                print(f"🔁 Tools now: {'Ollama' if USE_OLLAMA_TOOLS else 'OpenAI'}")
-                            else:
-                                USE_OLLAMA_CORE = not USE_OLLAMA_CORE
-                                USE_OLLAMA_TOOLS = not USE_OLLAMA_TOOLS
-                                print(
-                                    f"🔁 Core: {'Ollama' if USE_OLLAMA_CORE else 'OpenAI'}, Tools: {'Ollama' if USE_OLLAMA_TOOLS else 'OpenAI'}"
-                                )
-                            continue
+            if _COMMAND_SEP in text:
+                await _finish_pending(pending)
+                pending = None
+                await interpret_and_dispatch(ctx, text)
+                continue
 
-                        # Build system + user context for LLM
-                        context = [
-                            {"role": "system", "content": _build_system_prompt()},
-                            {"role": "user", "content": text},
-                        ]
+            planning = asyncio.create_task(_plan_one(ctx, text))
+            await _finish_pending(pending)
+            pending = None
+            plan = await planning
+            if not plan:
+                continue
 
-                        plan = await interpret_intent(text)
-                        if not plan:
-                            continue
+            if plan.get("action") in _CONCURRENT_ACTIONS:
+                # Ask any clarifying question now, while we still own the prompt
+                plan = await clarify_email(plan)
+                if plan:
+                    pending = asyncio.create_task(_handle_plan(ctx, plan))
+            else:
+                await _handle_plan(ctx, plan)
 
-                        # print("🧩 LLM output:", json.dumps(plan, indent=2))
 
-                        # --- If LLM couldn’t parse or flagged invalid ---
-                        if plan.get("action") == "invalid":
-                            print(f"❌ {plan.get('reason', 'I could not extract enough information.')}")
-                            continue
+async def _run_cli(batch_path: Optional[str] = None) -> None:
+    """
+    Run main() with Ctrl-C handling suited to threaded prompts.
 
-                        # --- Email clarifications (subject, recipients) ---
-                        plan = await clarify_email(plan)
-                        if not plan:
-                            continue
+    Ctrl-C cancels main(), so janet_session() still stops the servers and saves the
+    plan cache. asyncio.run() would then wait for the prompt thread still blocked in
+    input() until Enter was pressed, so the process exits here instead. A second
+    Ctrl-C during that cleanup exits at once.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    interrupted = False
+
+    def _on_sigint(signum: int, frame: Any) -> None:
+        nonlocal interrupted
+        if interrupted:
+            os._exit(130)
+        interrupted = True
+        loop.call_soon_threadsafe(task.cancel)
+
+    signal.signal(signal.SIGINT, _on_sigint)
+    try:
+        await main(batch_path)
+    except asyncio.CancelledError:
+        if not interrupted:
+            raise
+        print("\n👋 Goodbye!", flush=True)
+        plan_cache.flush()
+        os._exit(130)
 
-                        # --- Dispatch action ---
-                        action = plan.get("action", "")
-                        params = plan.get("params", {})
-
-                        # ---------------- EMAIL ----------------
-                        if action == "send_email":
-                            await handle_send_email(gmail_session, params)
-                        elif action == "search_emails":
-                            await handle_search_and_read(gmail_session, params)
-                        elif action == "read_email":
-                            await handle_read_email(gmail_session, params)
-                        elif action == "draft_email":
-                            await handle_draft_email(gmail_session, params)
-
-                        # ---------------- CALENDAR ----------------
-                        elif action == "create_event":
-                            await handle_create_event(calendar_session, params)
-                        elif action == "list_events":
-                            await handle_list_events(calendar_session, params)
-
-                        # ---------------- PDF ----------------
-                        elif action == "read_pdf":
-                            async with pdf_session() as ps:
-                                await handle_read_pdfs(ps, params)
-                        elif action == "query_pdf":
-                            question = params.get("question", text)
-                            await handle_query_pdfs(
-                                question,
-                                client,
-                                use_ollama=USE_OLLAMA_TOOLS,
-                                openai_model=OPENAI_MODEL,
-                                ollama_model=OLLAMA_MODEL,
-                            )
-
-                        # ---------------- WEB SEARCH ----------------
-                        elif action == "search_web":
-                            query = params.get("query")
-                            if not query:
-                                print("❓ Missing query for web search.")
-                                continue
-                            try:
-                                async with search_session() as ss:
-                                    await perform_web_search(
-                                        ss,
-                                        query,
-                                        use_ollama=USE_OLLAMA_TOOLS,
-                                        openai_model=OPENAI_MODEL,
-                                        ollama_model=OLLAMA_MODEL,
-                                    )
-                            except Exception as e:
-                                print(f"❌ Web search failed: {e}")
-
-                        # ---------------- PIZZA----------------
-                        elif action == "order_pizza":
-                            try:
-                                lower = text.lower()
-                                if "domino" in lower or "domino's" in lower or "dominos" in lower:
-                                    await handle_order_dominos(params)
-                                else:
-                                    await handle_order_papa(params)
-                                #await handle_order_pizza_web(pizza_web_session, params)
-                            except Exception as e:
-                                print(f"❌ Pizza assistant failed: {e}")
-
-                        # ---------------- ASK USER ----------------
-                        elif action == "ask_user":
-                            new_plan = await handle_ask_user(plan, client, context)
-                            if new_plan:
-                                # 🌀 recursive continuation: feed new plan back into handler
-                                print("🔁 Continuing with clarified action...")
-                                plan = new_plan
-                                action = plan.get("action", "")
-                                params = plan.get("params", {})
-                                # Do not 'continue' here — directly re-run dispatcher
-                                # Prevents losing context due to loop reset
-                                if action == "send_email":
-                                    await handle_send_email(gmail_session, params)
-                                elif action == "search_emails":
-                                    await handle_search_and_read(gmail_session, params)
-                                elif action == "create_event":
-                                    await handle_create_event(calendar_session, params)
-                                elif action == "list_events":
-                                    await handle_list_events(calendar_session, params)
-                                elif action == "read_pdf":
-                                    async with pdf_session() as ps:
-                                        await handle_read_pdfs(ps, params)
-                                elif action == "query_pdf":
-                                    question = params.get("question", text)
-                                    await handle_query_pdfs(
-                                        question,
-                                        client,
-                                        use_ollama=USE_OLLAMA_TOOLS,
-                                        openai_model=OPENAI_MODEL,
-                                        ollama_model=OLLAMA_MODEL,
-                                    )
-                                elif action == "search_web":
-                                    query = params.get("query")
-                                    async with search_session() as ss:
-                                        await perform_web_search(
-                                            ss,
-                                            query,
-                                            use_ollama=USE_OLLAMA_TOOLS,
-                                            openai_model=OPENAI_MODEL,
-                                            ollama_model=OLLAMA_MODEL,
-                                        )
-                                elif action == "order_pizza":
-                                    lower2 = text.lower()
-                                    if "domino" in lower2 or "domino's" in lower2 or "dominos" in lower2:
-                                        await handle_order_dominos(params)
-                                    else:
-                                        await handle_order_papa(params)
-                                    #await handle_order_pizza_web(pizza_web_session, params)
-                                else:
-                                    print("🤔 Clarification complete, but no valid follow-up action detected.")
-                            else:
-                                print("⚠️ Could not resolve clarification — skipping.")
-
-                        # ---------------- UNKNOWN ----------------
-                        else:
-                            print("I didn’t understand that command.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Janet CLI assistant")
+    parser.add_argument("--batch", metavar="FILE", help="run one request per line from FILE, then exit")
+    args = parser.parse_args()
+    asyncio.run(_run_cli(args.batch))
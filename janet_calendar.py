@@ -7,6 +7,11 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
 
+async def _ainput(prompt: str) -> str:
+    """input() on a worker thread so the event loop isn't blocked while the user types."""
+    return await asyncio.to_thread(input, prompt)
+
+
 @asynccontextmanager
 async def connect_calendar_server():
     """
@@ -59,7 +64,7 @@ async def handle_create_event(session: ClientSession, params: dict):
     if params.get("location"):
         print("Location:", params["location"])
 
-    confirm = input("Create this event? [y/N] ").strip().lower()
+    confirm = (await _ainput("Create this event? [y/N] ")).strip().lower()
     if confirm != "y":
         print("Cancelled.")
         return
@@ -74,6 +79,26 @@ import json
 from datetime import datetime
 from dateutil import parser as dateparser  # pip install python-dateutil
 
+try:
+    import orjson
+
+    def _loads(data: str):
+        return orjson.loads(data)
+except ImportError:
+    def _loads(data: str):
+        return json.loads(data)
+
+
+_DECODER = json.JSONDecoder()
+
+
+def _parse_dt(text: str) -> datetime:
+    """Parse ISO 8601 with the stdlib fast path; fall back to dateutil for anything else."""
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return dateparser.parse(text)
+
 
 # async def handle_list_events(session: ClientSession, params: dict | None = None):
 #     """
@@ -166,12 +191,12 @@ async def handle_list_events(session: ClientSession, params: dict | None = None)
         print("⚠️ LLM did not specify a date range — defaulting to today.")
 
     if start_date_text:
-        start_dt = dateparser.parse(start_date_text)
+        start_dt = _parse_dt(start_date_text)
     else:
         start_dt = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
     if end_date_text:
-        end_dt = dateparser.parse(end_date_text)
+        end_dt = _parse_dt(end_date_text)
     else:
         end_dt = now.replace(hour=23, minute=59, second=59, microsecond=0)
 
@@ -196,20 +221,24 @@ async def handle_list_events(session: ClientSession, params: dict | None = None)
 
     raw = result.content[0].text
     try:
-        events_json = json.loads(raw)
+        events_json = _loads(raw)
+    except json.JSONDecodeError:
+        events_json = None
+    if isinstance(events_json, dict):
         events = events_json.get("events") or events_json.get("items") or []
-    except Exception:
+    elif isinstance(events_json, list):
+        events = events_json
+    else:
+        # Salvage the first JSON array from mixed text in one pass, without slicing
         start = raw.find("[")
-        end = raw.rfind("]")
-        if start != -1 and end != -1:
-            try:
-                events = json.loads(raw[start:end + 1])
-            except Exception:
-                print("⚠️ Couldn't parse events properly.")
-                return
-        else:
+        if start == -1:
             print("⚠️ No structured event data found.")
             return
+        try:
+            events, _ = _DECODER.raw_decode(raw, start)
+        except json.JSONDecodeError:
+            print("⚠️ Couldn't parse events properly.")
+            return
 
     if not events:
         print("No events found for that range.")
@@ -224,11 +253,11 @@ async def handle_list_events(session: ClientSession, params: dict | None = None)
         html = ev.get("htmlLink", "")
 
         if "dateTime" in start_obj:
-            start = dateparser.parse(start_obj["dateTime"])
-            end = dateparser.parse(end_obj.get("dateTime", start_obj["dateTime"]))
+            start = _parse_dt(start_obj["dateTime"])
+            end = _parse_dt(end_obj.get("dateTime", start_obj["dateTime"]))
             time_str = f"{start.strftime('%a, %b %d, %Y, %I:%M %p')} – {end.strftime('%I:%M %p')}"
         elif "date" in start_obj:
-            start = dateparser.parse(start_obj["date"])
+            start = _parse_dt(start_obj["date"])
             time_str = f"{start.strftime('%a, %b %d, %Y')} (All day)"
         else:
             time_str = "(No start time)"
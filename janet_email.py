@@ -2,17 +2,31 @@
 Email-related handlers and utilities for Janet (Gmail MCP).
 
 Exports:
+- connect_gmail_server(): async context manager yielding a ready Gmail MCP session
 - ACTIONS: mapping of action name -> async handler
 - clarify_missing_fields(plan): prompts user for missing email fields
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
+import os
 import re
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional, TypedDict, Callable
 
-from mcp import ClientSession
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+try:
+    import orjson
+
+    def _loads(data: str) -> Any:
+        return orjson.loads(data)
+except ImportError:
+    def _loads(data: str) -> Any:
+        return json.loads(data)
 
 
 class EmailParams(TypedDict, total=False):
@@ -22,31 +36,63 @@ class EmailParams(TypedDict, total=False):
     messageId: str
 
 
+async def _ainput(prompt: str) -> str:
+    """input() on a worker thread so the event loop isn't blocked while the user types."""
+    return await asyncio.to_thread(input, prompt)
+
+
+@asynccontextmanager
+async def connect_gmail_server():
+    """
+    Launches the Gmail MCP server and yields a ready session.
+    """
+    server = StdioServerParameters(
+        command="npx",
+        args=["@gongrzhe/server-gmail-autoauth-mcp"],
+        env=os.environ.copy(),
+    )
+    async with stdio_client(server) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+_CANCEL_WORDS = frozenset({"cancel", "quit", "exit"})
+# Upper bound on emails read for one search, however many the plan asks for
+_MAX_PREVIEWS = 5
+
+# Blank-line separator, including lines holding only whitespace
+_BLANK_LINE_RE = re.compile(r"\n\s*\n")
+# Header label in search results -> key in the parsed message dict
+_FIELD_KEYS: Dict[str, str] = {"ID": "id", "Subject": "subject", "From": "from", "Date": "date"}
+
+
 def _parse_search_results(text: str) -> List[Dict[str, Any]]:
     """Parse search results that might be JSON or plain text blocks."""
     try:
-        parsed = json.loads(text)
+        parsed = _loads(text)
         if isinstance(parsed, list):
             return parsed
-    except Exception:
+    except json.JSONDecodeError:
         pass
 
     messages: List[Dict[str, Any]] = []
-    entries = re.split(r"\n\s*\n", text.strip())  # split by blank lines
+    body = text.strip().replace("\r\n", "\n")
+    # Results are separated by plain blank lines; the regex is only needed when
+    # some line ends in stray whitespace (which could be a padded "blank" line)
+    if " \n" in body or "\t\n" in body:
+        entries = _BLANK_LINE_RE.split(body)
+    else:
+        entries = body.split("\n\n")
     for block in entries:
         msg: Dict[str, Any] = {}
-        id_match = re.search(r"ID:\s*([^\n]+)", block)
-        subj_match = re.search(r"Subject:\s*([^\n]+)", block)
-        from_match = re.search(r"From:\s*([^\n]+)", block)
-        date_match = re.search(r"Date:\s*([^\n]+)", block)
-        if id_match:
-            msg["id"] = id_match.group(1).strip()
-        if subj_match:
-            msg["subject"] = subj_match.group(1).strip()
-        if from_match:
-            msg["from"] = from_match.group(1).strip()
-        if date_match:
-            msg["date"] = date_match.group(1).strip()
+        # One pass over the block's "Key: value" lines
+        for line in block.split("\n"):
+            key, sep, value = line.partition(":")
+            field = _FIELD_KEYS.get(key.strip()) if sep else None
+            value = value.strip()
+            if field and value:
+                msg.setdefault(field, value)
         if msg:
             messages.append(msg)
     return messages
@@ -58,15 +104,15 @@ async def handle_send_email(session: ClientSession, params: EmailParams) -> None
     if isinstance(to, str):  # type: ignore[unreachable]
         to = [to]  # defensive; model may produce string
     if not to:
-        to = [input("Recipient email: ").strip()]
-    subject = params.get("subject") or input("Subject: ").strip()
-    body = params.get("body") or input("Body: ").strip()
+        to = [(await _ainput("Recipient email: ")).strip()]
+    subject = params.get("subject") or (await _ainput("Subject: ")).strip()
+    body = params.get("body") or (await _ainput("Body: ")).strip()
 
     print("\n--- Email Preview ---")
     print("To:", ", ".join(to))
     print("Subject:", subject)
     print("Body:\n", body)
-    confirm = input("Send this email? [y/N] ").strip().lower()
+    confirm = (await _ainput("Send this email? [y/N] ")).strip().lower()
     if confirm != "y":
         print("Cancelled.")
         return
@@ -76,7 +122,7 @@ async def handle_send_email(session: ClientSession, params: EmailParams) -> None
 
 
 async def handle_search_and_read(session: ClientSession, params: Dict[str, Any]) -> None:
-    """Search for emails, pick the most relevant reply, and read it."""
+    """Search for emails, pick the most relevant reply, and read it (plus any extra previews)."""
     query = params.get("query", "")
     print(f"🔍 Searching emails for: {query}")
     result = await session.call_tool("search_emails", arguments={"query": query})
@@ -90,20 +136,35 @@ async def handle_search_and_read(session: ClientSession, params: Dict[str, Any])
         print("No messages parsed.")
         return
 
-    reply = next((m for m in messages if str(m.get("subject", "")).lower().startswith("re:")), None)
-    target = reply or messages[0]
-    msg_id = target.get("id")
-
-    print(f"📨 Found message: {target.get('subject')} from {target.get('from')} ({target.get('date')})")
-    print(f"🆔 Reading message ID: {msg_id}")
-
-    if not msg_id:
+    # Only the 3-char prefix needs lowering, not the whole subject
+    reply = next((m for m in messages if str(m.get("subject", ""))[:3].lower() == "re:"), None)
+    first = reply or messages[0]
+    # Optionally preview a few more results after the most relevant one
+    try:
+        preview_count = min(max(1, int(params.get("preview_count") or 1)), _MAX_PREVIEWS)
+    except (TypeError, ValueError):
+        preview_count = 1
+    targets = [first] + [m for m in messages if m is not first][: preview_count - 1]
+
+    for target in targets:
+        print(f"📨 Found message: {target.get('subject')} from {target.get('from')} ({target.get('date')})")
+    targets = [t for t in targets if t.get("id")]
+    if not targets:
         print("⚠️ Could not extract messageId from search results.")
         return
 
-    read_result = await session.call_tool("read_email", arguments={"messageId": msg_id})
-    content = read_result.content[0].text if read_result.content else None
-    print("\n--- Email Content ---\n", content or "(no content)")
+    # Fetch every preview concurrently: N reads cost about one round-trip
+    results = await asyncio.gather(
+        *(session.call_tool("read_email", arguments={"messageId": t["id"]}) for t in targets),
+        return_exceptions=True,
+    )
+    for target, read_result in zip(targets, results):
+        print(f"🆔 Reading message ID: {target['id']}")
+        if isinstance(read_result, Exception):
+            print(f"❌ Could not read message: {read_result}")
+            continue
+        content = read_result.content[0].text if read_result.content else None
+        print("\n--- Email Content ---\n", content or "(no content)")
 
 
 async def handle_draft_email(session: ClientSession, params: EmailParams) -> None:
@@ -120,7 +181,7 @@ async def handle_draft_email(session: ClientSession, params: EmailParams) -> Non
     print("To:", ", ".join(params["to"]))
     print("Subject:", params["subject"])
     print("Body:\n", params["body"])
-    confirm = input("Save this draft? [y/N] ").strip().lower()
+    confirm = (await _ainput("Save this draft? [y/N] ")).strip().lower()
     if confirm != "y":
         print("Cancelled.")
         return
@@ -158,13 +219,13 @@ async def clarify_missing_fields(plan: Dict[str, Any]) -> Optional[Dict[str, Any
         return plan  # complete
 
     print(f"🤔 I’m missing some information: {', '.join(missing)}.")
-    follow = input("Could you provide it now? (or 'cancel') ").strip()
-    if follow.lower() in {"cancel", "quit", "exit"}:
+    follow = (await _ainput("Could you provide it now? (or 'cancel') ")).strip()
+    if follow.lower() in _CANCEL_WORDS:
         print("Okay, cancelled this request.")
         return None
 
     for f in missing:
-        val = input(f"Please enter {f}: ").strip()
+        val = (await _ainput(f"Please enter {f}: ")).strip()
         if not val:
             print("Still incomplete; cancelling.")
             return None
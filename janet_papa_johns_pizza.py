@@ -1,5 +1,7 @@
 import asyncio
-from typing import Dict, Any, List, Tuple
+import os
+import weakref
+from typing import Dict, Any, List, Sequence, Tuple
 
 from playwright.async_api import async_playwright, Page
 
@@ -9,6 +11,55 @@ _browser = None
 _context = None
 _page = None
 
+_CANCEL_WORDS = frozenset({"cancel", "quit", "exit"})
+
+# Resource types the automation never reads; stylesheets only on request since
+# visibility checks depend on computed styles
+_BLOCKED_RESOURCES = frozenset(
+    {"image", "font", "media"} | ({"stylesheet"} if os.getenv("PJ_BLOCK_CSS") == "1" else set())
+)
+
+
+# Selector groups reused across the order flow (tuples, so they also key _SEL_CACHE cheaply)
+_COOKIE_SELECTORS = ("button:has-text('Accept All')", "button:has-text('Accept Cookies')")
+_START_ORDER_SELECTORS = (
+    r"role=button[name=/start\s*your\s*order/i]",
+    "button:has-text('Start Your Order')",
+    "a:has-text('Start Your Order')",
+    "[data-testid*='start-your-order']",
+)
+_STREET_SELECTORS = (
+    "input[aria-label*='Street' i]",
+    "input[name*='street' i]",
+    "input[placeholder*='Street' i]",
+    "label:has-text('Street') >> .. >> input",
+)
+_ZIP_SELECTORS = (
+    "input[aria-label*='ZIP' i]",
+    "input[aria-label*='Postal' i]",
+    "input[name*='zip' i]",
+    "input[name*='postal' i]",
+    "input[placeholder*='ZIP' i]",
+)
+_SUBMIT_LOCATION_SELECTORS = (
+    "button:has-text('Submit')",
+    "button:has-text('Search')",
+    "button:has-text('Continue')",
+    "button:has-text('Confirm Location')",
+)
+_ADD_TO_ORDER_SELECTORS = (
+    r"role=button[name=/add\s*to\s*(order|cart)/i]",
+    "button:has-text('Add to Order')",
+    "button:has-text('Add to Cart')",
+)
+
+
+async def _block_heavy_resources(route) -> None:
+    if route.request.resource_type in _BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 
 async def _ensure_browser(headless: bool = False) -> Page:
     global _playwright, _browser, _context, _page
@@ -18,39 +69,141 @@ async def _ensure_browser(headless: bool = False) -> Page:
                 return _page
         except Exception:
             pass
+    if _browser is not None and not _browser.is_connected():
+        # The user closed the browser window: relaunch rather than reuse a dead handle
+        _browser = _context = None
     if _playwright is None:
         _playwright = await async_playwright().start()
     if _browser is None:
         _browser = await _playwright.chromium.launch(headless=headless)
     if _context is None:
         _context = await _browser.new_context()
+        await _context.route("**/*", _block_heavy_resources)
     _page = await _context.new_page()
     return _page
 
 
-async def _click_if_present(page: Page, selectors: List[str], timeout: int = 2000) -> bool:
-    for sel in selectors:
+# page -> {selector list -> the selector from that list that last matched}. Weak keys, so a
+# closed page's entries go with it instead of leaking to a later page.
+_SEL_CACHE: "weakref.WeakKeyDictionary[Page, Dict[Tuple[str, ...], str]]" = weakref.WeakKeyDictionary()
+
+
+def _cached_first(page: Page, selectors: Sequence[str]) -> Tuple[Dict[Tuple[str, ...], str], Tuple[str, ...], Sequence[str]]:
+    """Return the page's cache, the cache key and the selectors reordered so the last winner is tried first."""
+    cache = _SEL_CACHE.setdefault(page, {})
+    key = tuple(selectors)
+    hit = cache.get(key)
+    if hit is None:
+        return cache, key, selectors
+    return cache, key, [hit] + [s for s in selectors if s != hit]
+
+
+async def _visible_among(page: Page, selectors: Sequence[str], timeout: int) -> List[str]:
+    """Wait for all selectors at once and return those visible when the first one shows up.
+
+    A missing selector costs one shared timeout instead of one timeout each. Matches are
+    returned in list order, so earlier selectors still win ties.
+    """
+    waits = {
+        asyncio.create_task(page.locator(sel).first.wait_for(state="visible", timeout=timeout)): sel
+        for sel in selectors
+    }
+    pending = set(waits)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # exception() also marks failed waits as retrieved
+            found = [waits[t] for t in done if t.exception() is None]
+            if found:
+                return sorted(found, key=selectors.index)
+        return []
+    finally:
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _do_action(
+    page: Page,
+    selectors: Sequence[str],
+    action: str,
+    *,
+    value: str = "",
+    require_enabled: bool = False,
+    timeout: int = 2000,
+) -> bool:
+    """Click or fill ("click" / "fill") the first visible match among selectors.
+
+    With require_enabled, disabled matches are skipped and the element is scrolled
+    into view before clicking. The winning selector is remembered in _SEL_CACHE.
+    """
+    cache, key, ordered = _cached_first(page, selectors)
+    for sel in await _visible_among(page, ordered, timeout):
         try:
-            el = await page.wait_for_selector(sel, timeout=timeout)
-            await el.click()
+            loc = page.locator(sel).first
+            if require_enabled:
+                # Some buttons may be in view but disabled
+                try:
+                    if not await loc.is_enabled():
+                        continue
+                except Exception:
+                    pass
+                try:
+                    await loc.scroll_into_view_if_needed()
+                except Exception:
+                    pass
+            if action == "fill":
+                await loc.fill("")
+                await loc.type(value)
+            else:
+                await loc.click()
+            cache[key] = sel
             return True
         except Exception:
             continue
     return False
 
 
-async def _fill_if_present(page: Page, selectors: List[str], value: str, timeout: int = 2500) -> bool:
+async def _click_if_present(page: Page, selectors: Sequence[str], timeout: int = 2000) -> bool:
+    return await _do_action(page, selectors, "click", timeout=timeout)
+
+
+async def _fill_if_present(page: Page, selectors: Sequence[str], value: str, timeout: int = 2500) -> bool:
     if not value:
         return False
-    for sel in selectors:
-        try:
-            el = await page.wait_for_selector(sel, timeout=timeout)
-            await el.fill("")
-            await el.type(value)
-            return True
-        except Exception:
-            continue
-    return False
+    return await _do_action(page, selectors, "fill", value=value, timeout=timeout)
+
+
+# Clicks a list of {"css": [...], "text": [...]} steps in the page. Each step clicks the first
+# visible, enabled match for its CSS selectors, then the first visible, enabled button/link whose
+# text contains one of `text`. Returns one hit flag per step. All clicks land in the same JS tick,
+# so only batch steps that don't depend on the page reacting to an earlier one.
+_BATCH_JS = """
+(steps) => steps.map((s) => {
+  const usable = (e) => !e.disabled && !!(e.offsetWidth || e.offsetHeight || e.getClientRects().length);
+  let el = null;
+  for (const sel of s.css || []) {
+    el = Array.from(document.querySelectorAll(sel)).find(usable);
+    if (el) break;
+  }
+  for (const want of s.text || []) {
+    if (el) break;
+    el = Array.from(document.querySelectorAll('button, a')).find(
+      (e) => usable(e) && e.textContent.toLowerCase().includes(want));
+  }
+  if (!el) return false;
+  el.click();
+  return true;
+})
+"""
+
+
+async def _run_batch(page: Page, steps: List[Dict[str, Any]]) -> List[bool]:
+    """Run several click steps in one browser round-trip; returns which steps found an element."""
+    try:
+        return await page.evaluate(_BATCH_JS, steps)
+    except Exception:
+        return [False] * len(steps)
 
 
 async def _leave_browser_open(page: Page) -> None:
@@ -58,6 +211,14 @@ async def _leave_browser_open(page: Page) -> None:
     print("Browser will remain open. You can close it when finished.")
 
 
+async def _wait_hidden(locator, timeout: int) -> None:
+    """Wait until the element is gone or hidden; resolves at once if it never existed."""
+    try:
+        await locator.wait_for(state="hidden", timeout=timeout)
+    except Exception:
+        pass
+
+
 async def _pick_first_address_suggestion(page: Page) -> bool:
     """After typing street address, pick the first suggestion from the autocomplete list.
 
@@ -77,7 +238,7 @@ async def _pick_first_address_suggestion(page: Page) -> bool:
             first = page.locator(sel).first
             await first.wait_for(state="visible", timeout=1500)
             await first.click()
-            await asyncio.sleep(0.2)
+            await _wait_hidden(page.locator("[role='listbox']").first, 1000)
             return True
         except Exception:
             continue
@@ -85,7 +246,7 @@ async def _pick_first_address_suggestion(page: Page) -> bool:
     try:
         await page.keyboard.press("ArrowDown")
         await page.keyboard.press("Enter")
-        await asyncio.sleep(0.2)
+        await _wait_hidden(page.locator("[role='listbox']").first, 1000)
         return True
     except Exception:
         return False
@@ -96,27 +257,23 @@ async def _dismiss_any_modal(page: Page) -> bool:
 
     Returns True if an action was taken that likely closed a modal.
     """
-    acted = False
     # Prefer explicit negative/close actions
-    for sel in [
-        "button:has-text('No Thanks')",
-        "button:has-text('No thank')",
-        "button:has-text('No, thanks')",
-        "button:has-text('Maybe later')",
-        "button:has-text('Skip')",
-        "button:has-text('Close')",
-        "[aria-label='Close']",
-        "[aria-label*='close' i]",
-        "button:has-text('Continue to checkout')",
-        "button:has-text('Continue shopping')",
-    ]:
-        try:
-            el = await page.wait_for_selector(sel, timeout=1200)
-            await el.click()
-            acted = True
-            break
-        except Exception:
-            continue
+    acted = await _click_if_present(
+        page,
+        [
+            "button:has-text('No Thanks')",
+            "button:has-text('No thank')",
+            "button:has-text('No, thanks')",
+            "button:has-text('Maybe later')",
+            "button:has-text('Skip')",
+            "button:has-text('Close')",
+            "[aria-label='Close']",
+            "[aria-label*='close' i]",
+            "button:has-text('Continue to checkout')",
+            "button:has-text('Continue shopping')",
+        ],
+        timeout=1200,
+    )
     if not acted:
         # Try pressing Escape
         try:
@@ -131,9 +288,9 @@ async def _dismiss_any_modal(page: Page) -> bool:
             acted = True
         except Exception:
             pass
-    # Small pause to allow UI to update
+    # Let the modal finish closing before the next interaction
     if acted:
-        await asyncio.sleep(0.3)
+        await _wait_hidden(page.get_by_role("dialog").first, 1000)
     return acted
 
 
@@ -218,29 +375,9 @@ def _is_large_or_above(size_text: str) -> bool:
     return any(any(chk(t) for t in tokens) for chk in checks)
 
 
-async def _click_enabled(page: Page, selectors: List[str], timeout: int = 4000) -> bool:
+async def _click_enabled(page: Page, selectors: Sequence[str], timeout: int = 4000) -> bool:
     """Click the first visible, enabled element matching any selector."""
-    for sel in selectors:
-        try:
-            loc = page.locator(sel).first
-            await loc.wait_for(state="visible", timeout=timeout)
-            # Some buttons may be in view but disabled
-            try:
-                if hasattr(loc, "is_enabled"):
-                    enabled = await loc.is_enabled()
-                    if not enabled:
-                        continue
-            except Exception:
-                pass
-            try:
-                await loc.scroll_into_view_if_needed()
-            except Exception:
-                pass
-            await loc.click()
-            return True
-        except Exception:
-            continue
-    return False
+    return await _do_action(page, selectors, "click", require_enabled=True, timeout=timeout)
 
 
 async def _select_by_label(page: Page, label_keywords: List[str], option_text: str) -> None:
@@ -262,16 +399,17 @@ async def _select_by_label(page: Page, label_keywords: List[str], option_text: s
             except Exception:
                 continue
 
-    # Fallback: scan for any select near the words
+    # Fallback: the first <select> after a label mentioning the keyword
     for key in label_keywords:
         try:
-            # narrow to selects that might correspond
-            sel = await page.wait_for_selector("select", timeout=1500)
-            try:
-                await sel.select_option(label=option_text)
+            sel = page.locator(
+                "xpath=//label[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', "
+                f"'abcdefghijklmnopqrstuvwxyz'), '{key.lower()}')]/following::select[1]"
+            ).first
+            # count() answers immediately, so a page without one costs no wait
+            if await sel.count():
+                await sel.select_option(label=option_text, timeout=1500)
                 return
-            except Exception:
-                continue
         except Exception:
             continue
 
@@ -292,7 +430,7 @@ async def _handle_unavailable_combo(page: Page) -> bool:
         ],
         timeout=3000,
     )
-    await asyncio.sleep(0.3)
+    await _wait_hidden(page.locator(r"text=/combination\s+is\s+not\s+available/i").first, 1500)
     return clicked
 
 async def _choose_option_button(page: Page, keywords: List[str], value_text: str) -> bool:
@@ -473,166 +611,71 @@ async def _open_combobox_and_pick(page: Page, keywords: List[str], value_text: s
     return False
 
 
-async def _scroll_to_most_popular(page: Page) -> None:
-    """Scroll to the 'Most Popular' section if visible to increase card match reliability."""
+async def _start_driver() -> None:
+    """Start the Playwright driver process. It opens no window, so it can run during prompts."""
+    global _playwright
+    if _playwright is None:
+        _playwright = await async_playwright().start()
+
+
+async def _open_homepage() -> Page:
+    """Launch or reuse the browser, open papajohns.com, accept cookies and click Start Your Order."""
+    page = await _ensure_browser(headless=False)
+    await page.goto("https://www.papajohns.com/", wait_until="domcontentloaded")
     try:
-        sec = page.get_by_text("Most Popular", exact=False)
-        await sec.scroll_into_view_if_needed()
-        await asyncio.sleep(0.3)
+        await page.wait_for_selector(r"text=/start\s*your\s*order/i", timeout=6000)
     except Exception:
         pass
 
-
-async def _open_pizza_details(page: Page, name_tokens: List[str], timeout_ms: int = 10000) -> None:
-    """Best-effort open of a pizza's Details/Customize by matching tokens on the card.
-
-    Prefers cards under 'Most Popular' but will fall back to broader search and text clicks.
-    """
-    await _scroll_to_most_popular(page)
-    deadline = asyncio.get_event_loop().time() + (timeout_ms / 1000.0)
-    last_error = None
-    while asyncio.get_event_loop().time() < deadline:
+    # Accept cookies in one round-trip when the banner is already there
+    [cookies_ok] = await _run_batch(page, [
+        {"css": ["[data-testid*='accept']"], "text": ["accept all", "accept cookies"]},
+    ])
+    if not cookies_ok:
+        # The banner may render late; a short check keeps it from blocking later clicks
+        await _click_if_present(page, _COOKIE_SELECTORS, timeout=1000)
+    clicked = await _click_if_present(page, _START_ORDER_SELECTORS, timeout=6000)
+    if not clicked:
+        # Try scanning all buttons/links for the text
         try:
-            # Search containers likely holding product cards
-            containers = [
-                "xpath=//section[.//h2[contains(translate(., 'MOSTPOPULAR','mostpopular'),'most popular')]]",
-                "xpath=//section//*[contains(translate(., 'MOSTPOPULAR','mostpopular'),'most popular')]/ancestor::section[1]",
-                "xpath=//main",
-                "xpath=//body",
-            ]
-            for cont_sel in containers:
-                container = page.locator(cont_sel)
-                cards = container.locator("xpath=.//article | .//div[contains(@class,'card')] | .//li[contains(@class,'card')]")
-                count = await cards.count()
-                for i in range(min(count, 100)):
-                    c = cards.nth(i)
-                    try:
-                        txt = (await c.inner_text()).lower()
-                    except Exception:
-                        continue
-                    if all(tok.lower() in txt for tok in name_tokens):
-                        try:
-                            await c.scroll_into_view_if_needed()
-                        except Exception:
-                            pass
-                        # Try to click a Details/Customize-like control within the card
-                        detail_try = [
-                            "role=button[name=/details|customize|view/i]",
-                            "button:has-text('Details')",
-                            "button:has-text('Customize')",
-                            "a:has-text('Details')",
-                            "a:has-text('Customize')",
-                        ]
-                        clicked = False
-                        for sel in detail_try:
-                            try:
-                                btn = c.locator(sel).first
-                                await btn.wait_for(state="visible", timeout=1200)
-                                # ensure enabled if possible
-                                try:
-                                    if hasattr(btn, "is_enabled") and not await btn.is_enabled():
-                                        continue
-                                except Exception:
-                                    pass
-                                await btn.click()
-                                clicked = True
-                                break
-                            except Exception as e:
-                                last_error = e
-                                continue
-                        if clicked:
-                            return
-                        # Fallback: click the title or the card itself
-                        try:
-                            title = c.locator("xpath=.//h1|.//h2|.//h3|.//h4").first
-                            await title.click()
-                            return
-                        except Exception:
-                            try:
-                                await c.click()
-                                return
-                            except Exception as e:
-                                last_error = e
-                                continue
-            # Scroll and retry
-            try:
-                await page.mouse.wheel(0, 600)
-            except Exception:
-                pass
-            await asyncio.sleep(0.4)
-        except Exception as e:
-            last_error = e
-            await asyncio.sleep(0.3)
-    # Final fallback: click by text anywhere
-    try:
-        await page.get_by_text(name_tokens[0], exact=False).click()
-    except Exception:
-        if last_error:
-            # Swallow but keep behavior moving forward
+            await page.get_by_text("Start Your Order", exact=False).click()
+        except Exception:
             pass
+    return page
 
 
 async def handle_order_pizza(params: Dict[str, Any]):
     print("🍕 Pizza ordering Assistant - Papa John's")
     print("Type 'cancel' anytime to abort.")
 
-    def _prompt(msg: str) -> str:
-        try:
-            return input(msg).strip()
-        except KeyboardInterrupt:
-            print("\n❌ Cancelled.")
-            raise SystemExit(1)
+    async def _prompt(msg: str) -> str:
+        # Read on a worker thread so the browser tasks keep running while the user types
+        return (await asyncio.to_thread(input, msg)).strip()
 
     # 1) Service selection — always Delivery (no prompt)
     service = "Delivery"
 
+    # Start the Playwright driver while the user types. The browser itself is launched
+    # after the prompts: a new window would take keyboard focus away from the terminal.
+    driver = asyncio.create_task(_start_driver())
+
     # 2) Address
-    street = _prompt("Street Address: ")
-    if street.lower() in {"cancel", "quit", "exit"}:
+    street = await _prompt("Street Address: ")
+    if street.lower() in _CANCEL_WORDS:
+        await asyncio.gather(driver, return_exceptions=True)
         print("Cancelled.")
         return
-    zip_code = _prompt("ZIP Code: ")
-    if zip_code.lower() in {"cancel", "quit", "exit"}:
+    zip_code = await _prompt("ZIP Code: ")
+    if zip_code.lower() in _CANCEL_WORDS:
+        await asyncio.gather(driver, return_exceptions=True)
         print("Cancelled.")
         return
 
-    # Launch or reuse a persistent browser page
-    page = await _ensure_browser(headless=False)
+    # A failed start is retried (and reported) by _ensure_browser
+    await asyncio.gather(driver, return_exceptions=True)
+    page = await _open_homepage()
     if True:
 
-        # Open homepage
-        await page.goto("https://www.papajohns.com/", wait_until="domcontentloaded")
-
-        # Accept cookies
-        await _click_if_present(
-            page,
-            [
-                "button:has-text('Accept All')",
-                "button:has-text('Accept all')",
-                "button:has-text('Accept Cookies')",
-                "[data-testid*='accept']",
-            ],
-            timeout=4000,
-        )
-
-        # Click Start Your Order
-        clicked = await _click_if_present(
-            page,
-            [
-                r"role=button[name=/start\s*your\s*order/i]",
-                "button:has-text('Start Your Order')",
-                "a:has-text('Start Your Order')",
-                "[data-testid*='start-your-order']",
-            ],
-            timeout=6000,
-        )
-        if not clicked:
-            # Try scanning all buttons/links for the text
-            try:
-                await page.get_by_text("Start Your Order", exact=False).click()
-            except Exception:
-                pass
-
         # Choose service
         if service == "Delivery":
             await _click_if_present(page, ["button:has-text('Delivery')", "[data-testid*='Delivery']"])  # lenient
@@ -640,50 +683,23 @@ async def handle_order_pizza(params: Dict[str, Any]):
             await _click_if_present(page, ["button:has-text('Carryout')", "button:has-text('Pickup')", "[data-testid*='Carryout']"])  # lenient
 
         # Fill address (Delivery): type street, pick first suggestion, then add ZIP
-        await asyncio.sleep(0.5)
-        await _fill_if_present(
-            page,
-            [
-                "input[aria-label*='Street' i]",
-                "input[name*='street' i]",
-                "input[placeholder*='Street' i]",
-                "label:has-text('Street') >> .. >> input",
-            ],
-            street,
-        )
+        # (the fill waits for the street input, so no pause is needed after the service click)
+        await _fill_if_present(page, _STREET_SELECTORS, street, timeout=3000)
         # Try to pick the first address suggestion from the dropdown
         try:
             await _pick_first_address_suggestion(page)
         except Exception:
             pass
-        await _fill_if_present(
-            page,
-            [
-                "input[aria-label*='ZIP' i]",
-                "input[aria-label*='Postal' i]",
-                "input[name*='zip' i]",
-                "input[name*='postal' i]",
-                "input[placeholder*='ZIP' i]",
-            ],
-            zip_code,
-        )
-
-        # Submit location
-        submitted = await _click_if_present(
-            page,
-            [
-                "button:has-text('Submit')",
-                "button:has-text('Search')",
-                "button:has-text('Continue')",
-                "button:has-text('Confirm Location')",
-            ],
-            timeout=8000,
-        )
+        # Typed, not set: the masked ZIP input and the form validation listen for keystrokes
+        await _fill_if_present(page, _ZIP_SELECTORS, zip_code)
+
+        # Submit location (the click waits for the button to become enabled)
+        submitted = await _click_if_present(page, _SUBMIT_LOCATION_SELECTORS, timeout=8000)
         if not submitted:
             # Sometimes pressing Enter in the last field might submit
             try:
                 await page.keyboard.press("Enter")
-                await asyncio.sleep(1)
+                await page.wait_for_load_state("networkidle", timeout=3000)
             except Exception:
                 pass
 
@@ -699,19 +715,14 @@ async def handle_order_pizza(params: Dict[str, Any]):
             await _click_if_present(page, ["button:has-text('Save')", "button:has-text('Continue')"], timeout=4000)
             await _click_if_present(page, ["button:has-text('Start Your Order')"], timeout=6000)
         else:
-            await _click_if_present(page, [
-                r"role=button[name=/start\s*your\s*order/i]",
-                "button:has-text('Start Your Order')",
-                "a:has-text('Start Your Order')",
-                "[data-testid*='start-your-order']",
-            ], timeout=6000)
+            await _click_if_present(page, _START_ORDER_SELECTORS, timeout=6000)
 
         # Go directly to selected pizza details URL for reliability
         print("Choose a pizza:")
         print("  1) Pepperoni Pizza")
         print("  2) Sausage Pizza")
         print("  3) Cheese Pizza")
-        sel = _prompt("Selection [1]: ") or "1"
+        sel = await _prompt("Selection [1]: ") or "1"
         try:
             idx = int(sel)
         except Exception:
@@ -732,16 +743,15 @@ async def handle_order_pizza(params: Dict[str, Any]):
             pass
 
         # Ask for configuration options
-        size = _prompt("Size (e.g., Small/Medium/Large/XL) [Large]: ") or "Large"
-        crust = _prompt("Crust (Original/Garlic Epic Stuffed/Epic Stuffed/New York Style/Thin) [Original]: ") or "Original"
-        qty_str = _prompt("Quantity [1]: ") or "1"
+        size = await _prompt("Size (e.g., Small/Medium/Large/XL) [Large]: ") or "Large"
+        crust = await _prompt("Crust (Original/Garlic Epic Stuffed/Epic Stuffed/New York Style/Thin) [Original]: ") or "Original"
+        qty_str = await _prompt("Quantity [1]: ") or "1"
         try:
             qty = max(1, int(qty_str))
         except Exception:
             qty = 1
 
-        # Configure drop-downs / selectors
-        await asyncio.sleep(0.4)
+        # Configure drop-downs / selectors (the details UI was awaited before prompting)
         # First: select Size
         try:
             await _select_by_label(page, ["Size"], size)
@@ -788,11 +798,7 @@ async def handle_order_pizza(params: Dict[str, Any]):
 
         # Add to Order
         # Ensure Add button is enabled before clicking
-        added = await _click_enabled(page, [
-            r"role=button[name=/add\s*to\s*(order|cart)/i]",
-            "button:has-text('Add to Order')",
-            "button:has-text('Add to Cart')",
-        ], timeout=8000)
+        added = await _click_enabled(page, _ADD_TO_ORDER_SELECTORS, timeout=8000)
         if not added:
             # Fallback: try selecting common defaults then click again
             try:
@@ -803,31 +809,24 @@ async def handle_order_pizza(params: Dict[str, Any]):
                 await _choose_option_button(page, ["Crust"], "Original")
             except Exception:
                 pass
-            added = await _click_enabled(page, [
-                r"role=button[name=/add\s*to\s*(order|cart)/i]",
-                "button:has-text('Add to Order')",
-                "button:has-text('Add to Cart')",
-            ], timeout=6000)
+            added = await _click_enabled(page, _ADD_TO_ORDER_SELECTORS, timeout=6000)
             if not added:
                 # Last attempt without checking enabled
-                added = await _click_if_present(page, [
-                    "button:has-text('Add to Order')",
-                    "button:has-text('Add to Cart')",
-                ], timeout=3000)
+                added = await _click_if_present(page, _ADD_TO_ORDER_SELECTORS[1:], timeout=3000)
         # If a 'Combination is not available' modal appears after clicking Add, dismiss and retry once
         if await _handle_unavailable_combo(page):
-            added = await _click_enabled(page, [
-                r"role=button[name=/add\s*to\s*(order|cart)/i]",
-                "button:has-text('Add to Order')",
-                "button:has-text('Add to Cart')",
-            ], timeout=6000)
+            added = await _click_enabled(page, _ADD_TO_ORDER_SELECTORS, timeout=6000)
         if not added:
             print("❌ Could not click Add to Order. Try choosing options directly in the browser.")
             await _leave_browser_open(page)
             return
 
-        # Go directly to checkout to avoid modal identification issues
-        await asyncio.sleep(0.6)
+        # Go directly to checkout to avoid modal identification issues, once the
+        # add-to-cart request has settled
+        try:
+            await page.wait_for_load_state("networkidle", timeout=3000)
+        except Exception:
+            pass
         await page.goto("https://www.papajohns.com/order/checkout", wait_until="domcontentloaded")
         print("🧾 Opened checkout directly. Complete remaining details in the browser.")
 
@@ -14,6 +14,8 @@ from typing import Dict, List, Tuple
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
 # Raw PDF text cache (per file)
 pdf_cache: Dict[str, str] = {}
 
@@ -207,9 +209,11 @@ async def handle_query_pdfs(
     use_ollama: bool = True,
     openai_model: str = "gpt-4o",
     ollama_model: str = "llama3",
+    ollama_client=None,
 ):
     """
     Answers a question based on cached PDF text using the provided LLM client.
+    Pass ollama_client to reuse one ollama.AsyncClient across calls.
     """
     if not pdf_cache:
         print("⚠️ No PDFs loaded yet. Use 'read_pdf' first.")
@@ -241,11 +245,11 @@ async def handle_query_pdfs(
 
     try:
         if use_ollama:
-            # Local model via Ollama (synchronous call inside async; acceptable like janet.py)
+            # Local model via Ollama (async client, so the event loop keeps running)
             import ollama
 
             print(f"🧠 Using local Ollama model for PDF QA: {ollama_model}")
-            response = ollama.chat(
+            response = await (ollama_client or ollama.AsyncClient()).chat(
                 model=ollama_model,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant."},
@@ -253,6 +257,9 @@ async def handle_query_pdfs(
                 ],
             )
             answer = response["message"]["content"].strip()
+        elif not (OPENAI_API_KEY and llm_client):
+            print("⚠️ No model for PDF QA: set OPENAI_API_KEY or switch tools to Ollama.")
+            return None
         else:
             # OpenAI GPT path
             print(f"🧠 Using OpenAI model for PDF QA: {openai_model}")
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import subprocess
@@ -7,6 +8,7 @@ from urllib.parse import quote as _urlquote
 
 DOM_TEST_DIR = os.path.join(os.path.dirname(__file__), 'dominos-mcp')
 CLI_PATH = os.path.join(DOM_TEST_DIR, 'cli.js')
+_CANCEL_WORDS = frozenset({"cancel", "quit", "exit"})
 
 
 def _run_node(cmd: List[str]) -> Dict[str, Any]:
@@ -17,7 +19,6 @@ def _run_node(cmd: List[str]) -> Dict[str, Any]:
             capture_output=True,
             text=True,
             cwd=DOM_TEST_DIR,
-            env=os.environ.copy(),
             timeout=60,
         )
     except FileNotFoundError:
@@ -27,7 +28,7 @@ def _run_node(cmd: List[str]) -> Dict[str, Any]:
 
     try:
         data = json.loads(result.stdout.strip() or '{}')
-    except Exception as e:
+    except json.JSONDecodeError as e:
         return {"ok": False, "error": f"Failed to parse CLI output: {e}", "raw": result.stdout}
     if result.returncode != 0 and data.get('ok') is not True:
         data.setdefault('error', f'CLI exited {result.returncode}')
@@ -50,12 +51,9 @@ def _print_menu_groups(groups: Dict[str, List[Dict[str, Any]]]):
         print("(No items found in these categories.)")
 
 
-def _prompt(msg: str) -> str:
-    try:
-        return input(msg).strip()
-    except KeyboardInterrupt:
-        print("\n❌ Cancelled.")
-        raise SystemExit(1)
+async def _prompt(msg: str) -> str:
+    # Read on a worker thread so the event loop isn't blocked while the user types
+    return (await asyncio.to_thread(input, msg)).strip()
 
 
 async def handle_order_pizza(params: Dict[str, Any]):
@@ -64,11 +62,11 @@ async def handle_order_pizza(params: Dict[str, Any]):
 
     # 1) Address
     while True:
-        address = _prompt("Delivery address: ")
+        address = await _prompt("Delivery address: ")
         if not address:
             print("Please enter an address.")
             continue
-        if address.lower() in {"cancel", "quit", "exit"}:
+        if address.lower() in _CANCEL_WORDS:
             print("Cancelled.")
             return
         resp = _run_node(["stores", "--address", address])
@@ -112,7 +110,7 @@ async def handle_order_pizza(params: Dict[str, Any]):
             dist_str = f"{dist}mi" if dist is not None else "distance n/a"
             flag = " (recommended)" if sid == rec.get("StoreID") else ""
             print(f"  [{i}] #{sid} — {addr} — {dist_str}{flag}")
-        choice = _prompt(f"Use recommended store #{rec.get('StoreID', 'unknown')}? (y/n or index 0-{min(4, len(stores)-1)}): ")
+        choice = await _prompt(f"Use recommended store #{rec.get('StoreID', 'unknown')}? (y/n or index 0-{min(4, len(stores)-1)}): ")
         if choice.lower() in {"y", "yes", ""}:
             store = rec
         elif choice.isdigit() and int(choice) < len(stores[:5]):
@@ -126,7 +124,7 @@ async def handle_order_pizza(params: Dict[str, Any]):
         break
 
     # 2) Menu (optional)
-    see_menu = _prompt("Would you like to see the menu? (y/n): ")
+    see_menu = await _prompt("Would you like to see the menu? (y/n): ")
     groups = {}
     if see_menu.lower() in {"y", "yes"}:
         m = _run_node(["menu", "--store", store_id])
@@ -142,15 +140,16 @@ async def handle_order_pizza(params: Dict[str, Any]):
     cart: List[Dict[str, Any]] = []
     print("\nAdd items by their code (e.g., 14SCREEN) and quantity (e.g., 2). Type 'done' to finish.")
     for _ in range(5):
-        code = _prompt("Item code (or 'done'): ")
-        if code.lower() in {"done", "finish"}:
+        code = await _prompt("Item code (or 'done'): ")
+        lower = code.lower()
+        if lower in {"done", "finish"}:
             break
-        if code.lower() in {"cancel", "quit", "exit"}:
+        if lower in _CANCEL_WORDS:
             print("Cancelled.")
             return
         if not code:
             continue
-        qty_str = _prompt("Quantity (default 1): ")
+        qty_str = await _prompt("Quantity (default 1): ")
         try:
             qty = int(qty_str) if qty_str else 1
         except Exception:
@@ -164,10 +163,10 @@ async def handle_order_pizza(params: Dict[str, Any]):
 
     # 4) Customer details
     print("\nCustomer details (press Enter to keep defaults)")
-    first = _prompt("First name [Test]: ") or "Test"
-    last = _prompt("Last name [User]: ") or "User"
-    phone = _prompt("Phone [555-0100]: ") or "555-0100"
-    email = _prompt("Email [test@example.com]: ") or "test@example.com"
+    first = await _prompt("First name [Test]: ") or "Test"
+    last = await _prompt("Last name [User]: ") or "User"
+    phone = await _prompt("Phone [555-0100]: ") or "555-0100"
+    email = await _prompt("Email [test@example.com]: ") or "test@example.com"
 
     # 5) Price (no place for now)
     items_json = json.dumps(cart)
@@ -200,7 +199,7 @@ async def handle_order_pizza(params: Dict[str, Any]):
         # Offer quick retry with carryout if delivery not allowed
         err_text = (price.get('error') or '').lower()
         if 'servicemethodnotallowed' in err_text:
-            retry = _prompt("Delivery not allowed. Try Carryout instead? (y/n): ")
+            retry = await _prompt("Delivery not allowed. Try Carryout instead? (y/n): ")
             if retry.lower() in {"y", "yes"}:
                 price = _run_node([
                     "price",
@@ -240,11 +239,11 @@ async def handle_order_pizza(params: Dict[str, Any]):
 
     # 6) Collect card details (kept for testing; we do NOT place now)
     print("\n💳 Payment details (for testing — order will NOT be placed)")
-    card_number = _prompt("Card number (digits only): ")
-    exp = _prompt("Expiration (MM/YY): ")
-    cvv = _prompt("CVV: ")
-    postal = _prompt("Billing ZIP/Postal code: ")
-    tip_in = _prompt("Tip amount (e.g., 3.00) [optional]: ")
+    card_number = await _prompt("Card number (digits only): ")
+    exp = await _prompt("Expiration (MM/YY): ")
+    cvv = await _prompt("CVV: ")
+    postal = await _prompt("Billing ZIP/Postal code: ")
+    tip_in = await _prompt("Tip amount (e.g., 3.00) [optional]: ")
     try:
         tip_amt = float(tip_in) if tip_in else 0
     except Exception:
@@ -0,0 +1,249 @@
+"""
+janet_plan_cache.py — remembers user request → plan mappings so repeated
+requests skip the LLM round-trip.
+
+Two tiers:
+- exact: blake2b hash of the normalized request text
+- semantic (opt-in via JANET_SEMANTIC_CACHE=1): cosine similarity over
+  OpenAI embeddings of previously planned requests. A paraphrase can name a
+  different file, query or recipient, so a plan is only reused this way when
+  every parameter value appears verbatim in the new request, and never for
+  actions with side effects. Only such plans get embedded (in the background),
+  and a request is only embedded for lookup when one of them could match it.
+
+Entries are persisted to ~/.janet/plan_cache.json across sessions: every
+_SAVE_EVERY new plans (on a worker thread), when Janet's session closes and,
+as a last resort, at exit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import copy
+import hashlib
+import json
+import math
+import operator
+import os
+import re
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+CACHE_PATH = os.path.expanduser(os.getenv("JANET_PLAN_CACHE", "~/.janet/plan_cache.json"))
+SEMANTIC_ENABLED = os.getenv("JANET_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_THRESHOLD = 0.92
+EMBEDDING_MODEL = "text-embedding-3-small"
+_MAX_ENTRIES = 256
+# New plans held in memory before they are written out in the background
+_SAVE_EVERY = 10
+
+# Plans for these actions hold absolute dates resolved from "today"/"tomorrow"
+_DATE_SENSITIVE_ACTIONS = {"list_events", "create_event"}
+# Any other plan carrying an ISO or Gmail-style date (2025-10-24, after:2025/10/24) is too,
+# e.g. a search_emails query the planner resolved from "emails from today"
+_DATE_RE = re.compile(r"\b\d{4}[-/]\d{1,2}[-/]\d{1,2}\b")
+# These depend on the conversation rather than the request text alone
+_UNCACHEABLE_ACTIONS = {"ask_user", "invalid"}
+# Side effects: only ever reused for the exact same request
+_EXACT_ONLY_ACTIONS = {"send_email", "draft_email", "create_event", "order_pizza"}
+
+# key -> {"plan": dict, "date": "YYYY-MM-DD", "embedding": [float] | None}
+_entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_loaded = False
+_dirty = False
+_unsaved = 0
+
+
+def _key(user_text: str) -> str:
+    normalized = " ".join(user_text.strip().lower().split())
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+
+def _load() -> None:
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    if isinstance(data, dict):
+        _entries.update(data)
+
+
+def _write(data: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except OSError as e:
+        print(f"⚠️ Could not save plan cache: {e}")
+
+
+def _save() -> None:
+    global _dirty, _unsaved
+    if not _dirty:
+        return
+    _dirty, _unsaved = False, 0
+    _write(_entries)
+
+
+def _actions(plan: Dict[str, Any]) -> List[Any]:
+    """The plan's action plus those of any parallel steps."""
+    steps = (plan.get("params") or {}).get("steps") if plan.get("action") == "parallel" else None
+    return [plan.get("action")] + [s.get("action") for s in steps or [] if isinstance(s, dict)]
+
+
+def _is_date_bound(plan: Dict[str, Any]) -> bool:
+    if any(a in _DATE_SENSITIVE_ACTIONS for a in _actions(plan)):
+        return True
+    return any(_DATE_RE.search(v) for v in _param_values(plan.get("params")))
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    if _is_date_bound(entry.get("plan", {})):
+        return entry.get("date") == date.today().isoformat()
+    return True
+
+
+def _param_values(obj: Any) -> List[str]:
+    """Every string/number leaf of a plan's params (step action names excluded)."""
+    if isinstance(obj, dict):
+        return [v for k, item in obj.items() if k != "action" for v in _param_values(item)]
+    if isinstance(obj, list):
+        return [v for item in obj for v in _param_values(item)]
+    if isinstance(obj, (str, int, float)) and not isinstance(obj, bool):
+        return [str(obj)]
+    return []
+
+
+def _reusable_for(plan: Dict[str, Any], user_text: str) -> bool:
+    """True if a similar request's plan carries nothing the new request doesn't say."""
+    if any(a in _EXACT_ONLY_ACTIONS for a in _actions(plan)):
+        return False
+    text = " ".join(user_text.lower().split())
+    return all(v.lower() in text for v in _param_values(plan.get("params")))
+
+
+def _normalize(v: List[float]) -> List[float]:
+    norm = math.sqrt(math.fsum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    # Both sides are unit length, so this is their cosine similarity
+    return math.fsum(map(operator.mul, a, b))
+
+
+def lookup(user_text: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached plan for this exact request, if any."""
+    _load()
+    key = _key(user_text)
+    entry = _entries.get(key)
+    if not entry or not _is_fresh(entry):
+        return None
+    _entries.move_to_end(key)
+    # Handlers mutate params in place, so never hand out the cached dict itself
+    return copy.deepcopy(entry["plan"])
+
+
+async def embed(llm_client, user_text: str) -> Optional[List[float]]:
+    """Embed the request text for the semantic tier; None if unavailable."""
+    try:
+        response = await llm_client.embeddings.create(model=EMBEDDING_MODEL, input=user_text)
+        return list(response.data[0].embedding)
+    except Exception as e:
+        print(f"⚠️ Embedding failed, skipping semantic cache: {e}")
+        return None
+
+
+def lookup_semantic(embedding: Optional[List[float]], user_text: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the closest reusable cached plan above SEMANTIC_THRESHOLD, if any."""
+    if not embedding:
+        return None
+    _load()
+    query = _normalize(embedding)
+    best_score, best_plan = 0.0, None
+    for entry in _entries.values():
+        other = entry.get("embedding")
+        if not other or not _is_fresh(entry):
+            continue
+        score = _dot(query, other)
+        if score > best_score and _reusable_for(entry["plan"], user_text):
+            best_score, best_plan = score, entry["plan"]
+    if best_plan is None or best_score < SEMANTIC_THRESHOLD:
+        return None
+    return copy.deepcopy(best_plan)
+
+
+def has_semantic_candidates(user_text: str) -> bool:
+    """True if some embedded entry could be reused for this text, i.e. embedding it can pay off."""
+    _load()
+    return any(
+        e.get("embedding") and _is_fresh(e) and _reusable_for(e["plan"], user_text)
+        for e in _entries.values()
+    )
+
+
+def semantic_reusable(plan: Dict[str, Any], user_text: str) -> bool:
+    """True if this plan could be served for a paraphrase of user_text (worth embedding)."""
+    return _reusable_for(plan, user_text)
+
+
+def add_embedding(user_text: str, embedding: Optional[List[float]]) -> None:
+    """Attach an embedding to the cached entry for this request, if it is still there."""
+    global _dirty
+    key = _key(user_text)
+    entry = _entries.get(key)
+    if entry is None or not embedding:
+        return
+    # Replaced rather than mutated, so a snapshot being written keeps the old entry
+    _entries[key] = {**entry, "embedding": _normalize(embedding)}
+    _dirty = True
+
+
+def store(user_text: str, plan: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
+    """Remember the plan for this request; see save_in_background() and flush() for writing it out."""
+    global _dirty, _unsaved
+    if not isinstance(plan, dict) or any(a in _UNCACHEABLE_ACTIONS for a in _actions(plan)):
+        return
+    _load()
+    key = _key(user_text)
+    _entries[key] = {
+        "plan": copy.deepcopy(plan),
+        "date": date.today().isoformat(),
+        # Stored unit length so lookups only need a dot product per entry
+        "embedding": _normalize(embedding) if embedding else None,
+    }
+    _entries.move_to_end(key)
+    while len(_entries) > _MAX_ENTRIES:
+        _entries.popitem(last=False)
+    _dirty = True
+    _unsaved += 1
+
+
+def save_due() -> bool:
+    """True once _SAVE_EVERY plans have been stored since the last write."""
+    return _unsaved >= _SAVE_EVERY
+
+
+async def save_in_background() -> None:
+    """Write the cache on a worker thread, from a snapshot so lookups can go on meanwhile."""
+    global _dirty, _unsaved
+    if not _dirty:
+        return
+    _dirty, _unsaved = False, 0
+    # Entries are replaced, never mutated, so a shallow copy is a stable snapshot
+    await asyncio.to_thread(_write, dict(_entries))
+
+
+def flush() -> None:
+    """Write pending cache entries to disk (also runs automatically at exit)."""
+    _save()
+
+
+atexit.register(flush)
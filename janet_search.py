@@ -6,7 +6,10 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from mcp.client.stdio import stdio_client, StdioServerParameters
 from mcp.client.session import ClientSession
-from openai import AsyncOpenAI
+try:
+    from openai import AsyncOpenAI
+except ImportError:  # only needed for OpenAI summaries
+    AsyncOpenAI = None
 
 # Load environment variables (BRIGHT_API_TOKEN, WEB_UNLOCKER_ZONE)
 load_dotenv()
@@ -55,8 +58,13 @@ async def perform_web_search(
     use_ollama: bool = True,
     openai_model: str = "gpt-4o-mini",
     ollama_model: str = "llama3",
+    ollama_client=None,
+    llm_client=None,
 ):
-    """Run a web search using Bright Data and summarize results."""
+    """
+    Run a web search using Bright Data and summarize results.
+    Pass llm_client / ollama_client to reuse the caller's clients instead of building new ones.
+    """
     print(f"🔎 Searching the web for: {query}")
     result = await session.call_tool("search_engine", arguments={"query": query})
     cleaned = []
@@ -88,14 +96,14 @@ async def perform_web_search(
         if use_ollama:
             import ollama
             print(f"🧠 Summarizing with Ollama: {ollama_model}")
-            response = ollama.chat(
+            response = await (ollama_client or ollama.AsyncClient()).chat(
                 model=ollama_model,
                 messages=[{"role": "user", "content": summary_prompt}],
             )
             summary = response["message"]["content"].strip()
             print("🧠 Summary:\n" + summary)
-        elif OPENAI_API_KEY:
-            client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        elif OPENAI_API_KEY and (llm_client or AsyncOpenAI is not None):
+            client = llm_client or AsyncOpenAI(api_key=OPENAI_API_KEY)
             print(f"🧠 Summarizing with OpenAI: {openai_model}")
             completion = await client.chat.completions.create(
                 model=openai_model,